@@ -5,7 +5,7 @@ a = Analysis(
     ['GUI.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('vendor_rules.json', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
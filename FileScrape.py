@@ -1,6 +1,31 @@
+import csv
+import hashlib
+import locale
+import mmap
 import os
-import re
-from database import ExpensesDB
+import sys
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from database import DEFAULT_ACCOUNT, ExpensesDB
+from formats import DEFAULT_FORMAT, sniff_file
+from rules import VendorRules
+
+BATCH_SIZE = 1000  # Rows per executemany() call when bulk inserting
+
+# One parsed + classified CSV line, in the column order ExpensesDB.add_expenses_bulk expects.
+# fingerprint identifies the statement line so importing it again is a no-op (None = always insert).
+Expense = namedtuple('Expense', ['year_month', 'cost', 'price_category', 'transaction_type', 'vendor', 'fingerprint'],
+                     defaults=[None])
+
+HASH_CHUNK_SIZE = 1024 * 1024
+WATCH_INTERVAL = 5.0  # Seconds between folder scans in watch mode
+RANGE_BYTES = 8 * 1024 * 1024  # Size of the byte ranges process_large_csv hands to each worker
+RANGES_PER_WORKER = 2  # Ranges parsed ahead of the writer per worker; bounds memory on huge files
+MAX_RECORD_LINES = 10  # Most lines one quoted field may span; a quote left open longer than that is a stray one
+DATE_CACHE_SIZE = 1024  # Date fields LineReader remembers the is_date check for
 
 monthlyCosts = {
     "month": ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06",
@@ -21,96 +46,661 @@ def price_categorization(cost):
     else:   # > 10000.0
         return "Massive"
 
-def debit_finder(line):
-    debit_term = "INTERNET DEPOSIT"
-
-    if debit_term in line:
+def debit_finder(line, rules=None):
+    if (rules or default_rules()).has_debit_term(line):
         return "Debit"
 
     else:
         return "Credit"
 
-def vendor_finder(description):
-    # Special Cases
-    if "PREAUTHORIZED DEBIT" in description:
-        description = description.split("PREAUTHORIZED DEBIT", 1)[1].strip()  # Removes preauthorized debit as it is all
-                                                                              # Caps making it hard to tell from vendors
-    if "ATM WITHDRAWAL" in description:
-        return "ATM WITHDRAWAL"
-
-    if "Branch Transaction" in description:
-        return "BANK"
-
-    parts = description.split()  # Split up words by spaces
-    description_parts = []
-    skipped = False  # A long banking number can appear before and/or after the vendor name, so I track
-                                 # if it is gone yet
-
-    for part in reversed(parts):  # Start from the end of line (Vendor names were typically at the end)
-        if re.match(r'^[A-Z0-9]{8,}$', part) and re.search(r'[A-Z]', part) and re.search(r'\d', part):
-            if not skipped:
-                skipped = True
-                continue
+_default_rules = None
+
+def default_rules():
+    """The vendor/debit rules from vendor_rules.json (or $EXPENSE_ANALYZER_RULES), read on first use."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = VendorRules.load()
+    return _default_rules
+
+class VendorExtractor:
+    """Pulls the vendor name out of a bank description, memoizing results per raw description.
+
+    Statements repeat the same store over and over, so a bounded LRU cache skips the tokenizing
+    for most lines. hits/misses are kept for checking how well the cache is doing.
+    The matching itself is driven by a VendorRules ruleset, the default one unless given.
+    Safe to share between threads (process_csv_async parses on its own thread).
+    """
+
+    def __init__(self, cache_size=4096, rules=None):
+        self.cache_size = cache_size
+        self.rules = rules
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()  # An LRU update racing another thread's eviction can raise KeyError
+
+    def __call__(self, description):
+        cache = self._cache
+        with self._lock:
+            vendor = cache.get(description)
+            if vendor is not None:
+                cache.move_to_end(description)
+                self.hits += 1
+                return vendor
+            self.misses += 1
+
+        vendor = self.extract(description)  # Outside the lock, so threads don't queue up behind the matching
+        with self._lock:
+            cache[description] = vendor
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)  # Evict the least recently used description
+        return vendor
+
+    def cache_info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache), 'max_size': self.cache_size}
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def extract(self, description):
+        if self.rules is None:
+            self.rules = default_rules()  # Loaded here rather than at import so a bad rules file only breaks imports
+        return self.rules.vendor(description)
+
+vendor_finder = VendorExtractor()
+
+class ImportCancelled(Exception):
+    """Raised from a progress callback to abort an import; the open transaction is rolled back.
+
+    results holds {path: records_added} for files that were already committed before the cancel.
+    """
+
+    def __init__(self, *args, results=None):
+        super().__init__(*args)
+        self.results = results or {}
+
+def file_digest(path):
+    """Content hash of a whole file, the same value LineReader.content_hash gives after streaming it."""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint_scope(account):
+    """What goes in front of every fingerprinted line of account; nothing for the default account."""
+    return account.encode('utf-8') + b'\0' if account else b''
+
+def line_fingerprint(line, ordinal, scope=b''):
+    """64-bit id for a statement line. ordinal tells apart identical lines on the same day (two $2.50 coffees),
+    scope (see fingerprint_scope) the same line on two accounts' statements."""
+    digest = hashlib.blake2b(b"%b%d:%b" % (scope, ordinal, line.encode('utf-8')), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)  # Same as utf8_fingerprint, inlined as it runs for every line
+
+def utf8_fingerprint(line, ordinal, scope=b''):
+    """line_fingerprint for a line that is already UTF-8 bytes."""
+    digest = hashlib.blake2b(b"%b%d:%b" % (scope, ordinal, line), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)  # SQLite integers are signed 64-bit
+
+class LineReader:
+    """Streams the decoded lines of a file from byte offset start, counting and hashing bytes as it goes.
+
+    bytes_read is there for progress reporting. It also keeps track of where the last date's lines
+    begin, so file_info() can record how to carry on once more lines are appended to the file.
+    With follow set (watch mode) reading stops at the last newline: a last line without one may
+    still be being written, so it is left (and left out of file_info()) for the import after it is
+    finished. Otherwise the file is read to its end, as a statement's last line needn't have one.
+    bank_format and delimiter are detected from the start of the file (see formats.py), unless
+    bank_format is given; they say where each line's date is.
+    """
+
+    def __init__(self, path, encoding=None, start=0, bank_format=None, follow=False):
+        self.path = path
+        self.follow = follow
+        self.encoding = encoding or locale.getpreferredencoding(False)  # Same default as open(path, "r")
+        self.bank_format, self.delimiter = sniff_file(path, self.encoding, bank_format)
+        self.start = start
+        self.total_bytes = os.path.getsize(path) - start
+        self.bytes_read = 0
+        self.day_offset = start
+        self._digest = hashlib.blake2b()
+        self._day_digest = hashlib.blake2b()
+        self._day = None
+
+    def __iter__(self):
+        bank_format = self.bank_format
+        delimiter = self.delimiter
+        follow = self.follow
+        quote_field = delimiter + '"'
+        column = bank_format.date
+        dates = {}  # Field -> whether it is a date, as strptime is slow
+        with open(self.path, "rb") as file:
+            file.seek(self.start)
+            for raw_line in file:
+                if follow and not raw_line.endswith(b'\n'):
+                    break
+                line = raw_line.decode(self.encoding)
+                if line.startswith('"') or quote_field in line:
+                    day = line_date(line, bank_format, delimiter)
+                else:  # line_date's plain split, inlined as it runs for every line
+                    fields = line.split(delimiter, column + 1)
+                    day = fields[column] if len(fields) > column else None
+
+                # Only a real date starts a new day, not a blank line, the header or a quoted field's later lines
+                if day != self._day and day is not None:
+                    is_date = dates.get(day)
+                    if is_date is None:
+                        if len(dates) >= DATE_CACHE_SIZE:
+                            dates.clear()  # Statements are in date order, so earlier days rarely come back
+                        is_date = dates[day] = bank_format.is_date(day)
+                    if is_date:
+                        self._day = day
+                        self.day_offset = self.start + self.bytes_read
+                        self._day_digest = hashlib.blake2b()
+                self._day_digest.update(raw_line)
+                self.bytes_read += len(raw_line)
+                self._digest.update(raw_line)
+                yield line
+
+    @property
+    def content_hash(self):
+        return self._digest.hexdigest()
+
+    def file_info(self):
+        """What this read covered, for the file_imports row (complete once the file has been read through)."""
+        return {
+            'content_hash': self.content_hash,
+            'file_size': self.bytes_read,
+            'byte_offset': self.start + self.bytes_read,
+            'day_offset': self.day_offset,
+            'tail_hash': self._day_digest.hexdigest(),
+        }
+
+def resume_offset(path, database, account=DEFAULT_ACCOUNT, follow=False):
+    """Byte offset to import path into account from: 0 for a full import, None when nothing was added since then.
+
+    A file that has only been appended to since its last import picks up at the start of the last
+    date it had, so same-day lines keep their ordinals (see line_fingerprint) and the ones already
+    imported are dropped by their fingerprints. Any other change to the file means a full import.
+    With follow set only whole lines count as added, see LineReader.
+    """
+    last = database.last_import(path, account)
+    if last is None or last[0] is None:
+        return 0
+    byte_offset, day_offset, tail_hash = last
+
+    if os.path.getsize(path) < byte_offset:
+        return 0
+    with open(path, "rb") as file:
+        file.seek(day_offset)
+        if hashlib.blake2b(file.read(byte_offset - day_offset)).hexdigest() != tail_hash:
+            return 0
+        added = file.readline()
+        if not added or (follow and not added.endswith(b'\n')):
+            return None
+    return day_offset
+
+def csv_row(record, delimiter=','):
+    """The fields of record if it is one well-formed CSV record, else None (e.g. a stray quote in a description)."""
+    try:
+        return next(csv.reader([record], delimiter=delimiter, strict=True), [])
+    except csv.Error:
+        return None
+
+def line_date(line, bank_format=DEFAULT_FORMAT, delimiter=','):
+    """The date field of one line, split out the way parse_lines splits it, or None when there isn't one."""
+    column = bank_format.date
+    if line.startswith('"') or delimiter + '"' in line:
+        fields = csv_row(line.strip().rstrip(','), delimiter) or line.split(delimiter)
+    else:
+        fields = line.split(delimiter, column + 1)
+    return fields[column] if len(fields) > column else None
+
+def parse_lines(lines, bank_format=DEFAULT_FORMAT, delimiter=',', skip_header=False, account=DEFAULT_ACCOUNT):
+    """Parse statement lines into (year_month, description, cost, transaction_type, fingerprint), skipping lines with no amount.
+
+    bank_format says which columns hold what (CIBC unless told otherwise, see formats.py); pass
+    skip_header when the lines start with the file's header row. The fingerprints are account's.
+    """
+    current_date = None
+    seen = {}  # line -> times it has appeared on current_date; statements are in date order, so this stays small
+    date_column = bank_format.date
+    description_column = bank_format.description
+    row_cost = bank_format.cost
+    scope = fingerprint_scope(account)
+    month_date = year_month = None  # year_month is worked out once per run of lines with the same date
+
+    lines = iter(lines)
+    held = []  # Lines read ahead for a quoted field that wasn't one, still to be parsed (last one first)
+    quote_field = delimiter + '"'
+    while True:
+        line = held.pop() if held else next(lines, None)
+        if line is None:
+            return
+
+        if line.startswith('"') or quote_field in line:
+            # A quoted field, which can hold the delimiter and even newlines, so the csv reader splits it
+            record = line
+            following = []
+            while record.count('"') % 2 and len(following) < MAX_RECORD_LINES - 1:
+                more = held.pop() if held else next(lines, None)
+                if more is None:
+                    break
+                following.append(more)
+                record += more
+            row = csv_row(record.strip().rstrip(','), delimiter)
+            if row is None and following:  # The quote didn't open a field after all: parse the lines one by one
+                held.extend(reversed(following))
+                record = line
+                row = csv_row(record.strip().rstrip(','), delimiter)
+            line = record.strip().rstrip(',')  # Remove trailing spaces and commas
+            if row is None:  # A stray quote, which is just another character in its field
+                row = line.split(delimiter)
+        else:  # Without quotes a plain split gives the same fields as the csv reader, only quicker
+            line = line.strip().rstrip(',')
+            row = line.split(delimiter)
+
+        if skip_header and line:
+            skip_header = False
+            continue
+
+        date = row[date_column] if len(row) > date_column else ''
+
+        if date != current_date and bank_format.is_date(date):  # Blank and undated lines don't start a new day
+            current_date = date
+            seen = {}
+        ordinal = seen.get(line, 0)
+        seen[line] = ordinal + 1
+
+        cost = row_cost(row)
+        if cost is None:  # Skip if no amount
+            continue
+        if date != month_date:
+            month_date = date
+            year_month = bank_format.year_month(date)
+        description = row[description_column] if len(row) > description_column else ""
+
+        yield year_month, description, cost[0], cost[1], line_fingerprint(line, ordinal, scope)
+
+def classify(records):
+    """Turn parsed records into Expense rows ready for the database."""
+    for year_month, description, cost, transaction_type, fingerprint in records:
+        yield Expense(year_month, cost, price_categorization(cost), transaction_type, vendor_finder(description),
+                      fingerprint)
+
+def batched(rows, batch_size=BATCH_SIZE):
+    """Group rows into lists of at most batch_size, so only one batch is held in memory at a time."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def parse_csv(path, batch_size=BATCH_SIZE, progress=None, reader=None, bank_format=None, account=DEFAULT_ACCOUNT):
+    """Yield batches of Expense rows from a CSV file without touching the database.
+
+    progress, when given, is called after every batch as progress(records, bytes_read, total_bytes).
+    Pass in a LineReader to read its content_hash once the batches are used up. The file's bank
+    format is detected from its first lines unless bank_format (or the reader's) is given. The
+    fingerprints are account's.
+    """
+    reader = reader or LineReader(path, bank_format=bank_format)
+    bank_format, delimiter = reader.bank_format, reader.delimiter
+    lines = parse_lines(reader, bank_format, delimiter, skip_header=bank_format.has_header and reader.start == 0,
+                        account=account)
+    records = 0
+
+    for batch in batched(classify(lines), batch_size):
+        records += len(batch)
+        if progress is not None:
+            progress(records, reader.bytes_read, reader.total_bytes)
+        yield batch
+
+def already_imported(path, database, account=DEFAULT_ACCOUNT):
+    """True when a byte-identical file was imported into account before.
+
+    Only files with the same size as an earlier import get hashed up front; every other file
+    has its hash computed while it is streamed in, so new files are never read twice.
+    """
+    size = os.path.getsize(path)
+    return (bool(database.find_import(size, account=account))
+            and bool(database.find_import(size, file_digest(path), account)))
+
+def process_csv(path, database=None, batch_size=BATCH_SIZE, progress=None, account=DEFAULT_ACCOUNT, follow=False):
+    """Import a CSV file into account and return the number of records added.
+
+    A file identical to one imported before is skipped outright, one that has only grown since its
+    last import is read from where that import stopped, and lines the account already has from an
+    overlapping statement are left out, so importing the same data twice adds nothing. Give each
+    account its own name, or identical transactions on two accounts' statements count as one.
+    With no database this is a dry run: the file is fully parsed and classified and the
+    record count is returned, which is handy for validating a file before importing it.
+    follow is for a file that is still being written to (see watch_folder): a last line with no
+    newline is left for a later import.
+    """
+    if database is None:
+        return sum(len(batch) for batch in parse_csv(path, batch_size, progress, account=account))
+
+    start = resume_offset(path, database, account, follow)
+    if start is None or (start == 0 and already_imported(path, database, account)):
+        return 0
+
+    reader = LineReader(path, start=start, follow=follow)
+    batches = parse_csv(path, batch_size, progress, reader, account=account)
+
+    # One transaction for the rows and the file_imports entry, so a failed import never shows up as done
+    return database.add_expenses_bulk(batches, file_path=path, file_info=reader.file_info, account=account)
+
+def find_csv_files(paths):
+    """Expand a mix of file and directory paths into a sorted list of CSV files (directories are searched recursively)."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _dirs, names in os.walk(path):
+                files.extend(os.path.join(folder, name) for name in names if name.lower().endswith('.csv'))
+        else:
+            files.append(path)
+
+    return sorted(files)
+
+def _parse_file(path, batch_size, start=0, account=DEFAULT_ACCOUNT):
+    # Runs inside a worker process: parse + classify the file from start and ship the batches back
+    reader = LineReader(path, start=start)
+    batches = list(parse_csv(path, batch_size, reader=reader, account=account))
+    return batches, reader.file_info()
+
+def process_files(paths, database, workers=None, batch_size=BATCH_SIZE, progress=None, cancel=None,
+                  account=DEFAULT_ACCOUNT):
+    """Import many CSV files (or folders of them) into account and return {path: records_added}.
+
+    Files are parsed in parallel across worker processes, while this process is the single
+    writer, committing each file in its own bulk transaction as soon as it is parsed.
+    progress, when given, is called as progress(path, records_added, files_done, files_total).
+    cancel, a threading.Event, is checked before every write; once it is set the file being
+    written is rolled back, no more files are started and ImportCancelled is raised with the
+    results of the files already committed.
+    """
+    files = find_csv_files(paths)
+    results = {}
+
+    def check_cancel(*_):
+        if cancel is not None and cancel.is_set():
+            raise ImportCancelled(results=results)
+
+    if len(files) <= 1 or workers == 1:  # Not worth spinning up a pool
+        for path in files:
+            check_cancel()
+            results[path] = process_csv(path, database, batch_size, progress=check_cancel if cancel is not None else None,
+                                        account=account)
+            if progress is not None:
+                progress(path, results[path], len(results), len(files))
+        return results
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    cancelled = False
+    try:
+        futures = {}
+        for path in files:
+            start = resume_offset(path, database, account)
+            if start is None or (start == 0 and already_imported(path, database, account)):
+                results[path] = 0
+                if progress is not None:
+                    progress(path, 0, len(results), len(files))
             else:
-                break
+                futures[executor.submit(_parse_file, path, batch_size, start, account)] = path
 
-        if re.match(r'^\d{8,}$', part):  # Skip the first 8+ digit number we encounter using 're'
-            if not skipped:
-                skipped = True
-                continue
+        for future in as_completed(futures):
+            path = futures[future]
+            batches, file_info = future.result()
+            check_cancel()
+            results[path] = database.add_expenses_bulk(batches, file_path=path, file_info=lambda: file_info,
+                                                       account=account)
+            if progress is not None:
+                progress(path, results[path], len(results), len(files))
+    except ImportCancelled:
+        cancelled = True
+        # Drop the parses that haven't started (shutdown's cancel_futures, spelled out for Python 3.8)
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=not cancelled)  # Don't hold up a cancel for parses already running
+
+    return results
+
+def parse_range(buffer, start, end, encoding, account=DEFAULT_ACCOUNT):
+    """parse_lines for the whole lines of a CIBC file in buffer[start:end] (e.g. an mmap), splitting fields before decoding.
+
+    Gives exactly the same records and fingerprints as parse_lines on the decoded text; only the
+    date and description fields are ever decoded, the amounts go straight from bytes to float.
+    Only lines with a quoted field go through the csv reader.
+    """
+    current_date = None
+    seen = {}
+    scope = fingerprint_scope(account)
+
+    pos = start
+    while pos < end:
+        stop = buffer.find(b'\n', pos, end) + 1 or end
+        line = buffer[pos:stop]
+        if line.startswith(b'"') or b',"' in line:  # A quoted field, which can hold commas and newlines
+            line_stop = stop
+            spanned = 1
+            while line.count(b'"') % 2 and stop < end and spanned < MAX_RECORD_LINES:
+                stop = buffer.find(b'\n', stop, end) + 1 or end
+                line = buffer[pos:stop]
+                spanned += 1
+            row = csv_row(line.strip().rstrip(b',').decode(encoding))
+            if row is None and stop != line_stop:  # The quote didn't open a field after all: back to one line
+                stop = line_stop
+                line = buffer[pos:stop]
+                row = csv_row(line.strip().rstrip(b',').decode(encoding))
+            line = line.strip().rstrip(b',')
+            if row is None:  # A stray quote, which is just another character in its field
+                parts = line.split(b',')
             else:
-                break  # Stop at second long number
+                parts = [field.encode(encoding) for field in row] or [b'']
+        else:
+            line = line.strip().rstrip(b',')
+            parts = line.split(b',')  # A comma byte is always a comma in UTF-8 and the Windows code pages
+        pos = stop
+
+        date = parts[0]
+        year_month = b'-'.join(date.split(b'-')[:2]).decode(encoding)
+
+        # Blank and undated lines don't start a new day, as in parse_lines
+        if date != current_date and DEFAULT_FORMAT.is_date(date.decode(encoding, errors='replace')):
+            current_date = date
+            seen = {}
+        ordinal = seen.get(line, 0)
+        seen[line] = ordinal + 1
+
+        debit_amount = parts[2] if len(parts) > 2 and parts[2] else None
+        credit_amount = parts[3] if len(parts) > 3 and parts[3] else None
+        if not (debit_amount or credit_amount):
+            continue
+
+        description = parts[1].decode(encoding) if len(parts) > 1 else ""
+        # ASCII lines are their own UTF-8 encoding; anything else goes through the text form like parse_lines
+        fingerprint = (utf8_fingerprint(line, ordinal, scope) if line.isascii()
+                       else line_fingerprint(line.decode(encoding), ordinal, scope))
+
+        if debit_amount:
+            yield year_month, description, float(debit_amount), "Debit", fingerprint
+        else:
+            yield year_month, description, float(credit_amount), "Credit", fingerprint
+
+def _line_date(buffer, line_start, end, bank_format, delimiter, encoding):
+    # (date, end of line) for the line at line_start; the date is None unless the line has a real one
+    line_end = buffer.find(b'\n', line_start, end)
+    if line_end < 0:
+        line_end = end
+    date = line_date(buffer[line_start:line_end].decode(encoding, errors='replace'), bank_format, delimiter)
+    if date is not None and not bank_format.is_date(date):
+        date = None
+    return date, line_end
 
-        # Also stop at common banking keywords
-        if part.upper() in ['PURCHASE', 'RETAIL', 'INTERAC', 'SALE', 'POINT', 'OF', 'TRANSFER', 'FUNDS', 'ELECTRONIC',
-                            'BANKING', 'INTERNET']:
+def split_ranges(buffer, start, end, range_bytes=RANGE_BYTES, bank_format=DEFAULT_FORMAT, delimiter=',',
+                 encoding='utf-8'):
+    """Cut buffer[start:end] into [start, stop) ranges of about range_bytes that each begin on a new date.
+
+    Starting every range on a date change, not just a newline, keeps the same-day line ordinals
+    (and so the fingerprints) identical to reading the file in one go.
+    """
+    ranges = []
+    while end - start > range_bytes:
+        # Walk forward from the line holding the cut point until the date changes
+        line_start = buffer.rfind(b'\n', start, start + range_bytes) + 1 or start
+        day, line_end = _line_date(buffer, line_start, end, bank_format, delimiter, encoding)
+        cut = end
+        while line_end < end:
+            line_start = line_end + 1
+            date, line_end = _line_date(buffer, line_start, end, bank_format, delimiter, encoding)
+            if date is None:  # Blank, or part of a quoted field
+                continue
+            if day is None:  # The cut point wasn't on a dated line; the next date is the one to change from
+                day = date
+            elif date != day:
+                cut = line_start
+                break
+        if cut <= start or cut >= end:
             break
+        ranges.append((start, cut))
+        start = cut
+    ranges.append((start, end))
+    return ranges
 
-        description_parts.insert(0, part)  # Collecting the parts
+def last_day_offset(buffer, start, end, bank_format=DEFAULT_FORMAT, delimiter=',', encoding='utf-8'):
+    """Offset where the lines of the last date in buffer[start:end] begin, found by walking back from end."""
+    day = None
+    day_offset = start
+    line_end = end
+    while line_end > start:
+        line_start = buffer.rfind(b'\n', start, line_end - 1) + 1 or start
+        date, _ = _line_date(buffer, line_start, end, bank_format, delimiter, encoding)
+        if date is not None:  # Blank lines and a quoted field's later lines don't start a new day
+            if day is None:
+                day = date
+            elif date != day:
+                break
+            day_offset = line_start
+        line_end = line_start
+    return day_offset
 
-    vendor = ' '.join(description_parts)
+def _parse_range_file(path, start, end, batch_size, encoding, account):
+    # Runs inside a worker process: map the file and parse just this byte range
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return list(batched(classify(parse_range(buffer, start, end, encoding, account)), batch_size))
 
-    # Keep words that start with uppercase (allows "Garrison Brewin")
-    vendor = ' '.join([word for word in vendor.split() if word and word[0].isupper()])
+def process_large_csv(path, database=None, workers=None, batch_size=BATCH_SIZE, progress=None,
+                      range_bytes=RANGE_BYTES, encoding=None, account=DEFAULT_ACCOUNT):
+    """process_csv for very large files: the file is memory-mapped, cut into byte ranges on date
+    boundaries and the ranges are parsed in parallel worker processes.
 
-    vendor = re.sub(r'\s*[#C]\d*$', '', vendor)  # Find common patterns with trailing symbols and numbers
-    vendor = vendor.strip()
+    This process stays the single writer and inserts the ranges in file order, in one transaction,
+    while at most RANGES_PER_WORKER ranges per worker are parsed ahead of it, so memory stays flat
+    however big the file is. Skipping, tail-following and deduplication work as in process_csv.
+    progress, when given, is called as progress(records, bytes_read, total_bytes).
+    Only CIBC files are split up this way; other bank formats are handed to process_csv.
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+    workers = workers or os.cpu_count() or 1
 
-    return vendor if vendor else "UNKNOWN"
+    bank_format, delimiter = sniff_file(path, encoding)
+    if (bank_format, delimiter) != (DEFAULT_FORMAT, ','):
+        return process_csv(path, database, batch_size, progress, account)
 
-def process_csv(path, database):
-    records_added = 0  # Track how many records added
+    start = 0
+    if database is not None:
+        start = resume_offset(path, database, account)
+        if start is None or (start == 0 and already_imported(path, database, account)):
+            return 0
 
-    with open(path, "r") as file:
-        for line in file:
-            line = line.strip().rstrip(',')  # Remove trailing spaces and commas
-            parts = line.split(',')  # split the line into parts
+    with open(path, "rb") as file:
+        end = os.fstat(file.fileno()).st_size
+        if end <= start:
+            return 0
 
-            date = parts[0]  # Get the first part (date)
-            year_month = '-'.join(date.split('-')[:2])  # Extract year-month
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer, \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            ranges = iter(split_ranges(buffer, start, end, range_bytes, bank_format, delimiter, encoding))
 
-            description = parts[1] if len(parts) > 1 else ""  # Get the description of the transaction for later
+            def parsed_batches():
+                pending = deque()  # (range end, future) in file order
+                records = 0
+                while True:
+                    for range_start, range_end in islice(ranges, workers * RANGES_PER_WORKER - len(pending)):
+                        pending.append((range_end, executor.submit(
+                            _parse_range_file, path, range_start, range_end, batch_size, encoding, account)))
+                    if not pending:
+                        return
 
-            # BIG CHANGE, credits and debits seem to have their own columns, therefore we can parse & classify them here
-            debit_amount = parts[2] if len(parts) > 2 and parts[2] else None
-            credit_amount = parts[3] if len(parts) > 3 and parts[3] else None
+                    range_end, future = pending.popleft()
+                    for batch in future.result():
+                        records += len(batch)
+                        yield batch
+                    if progress is not None:
+                        progress(records, range_end - start, end - start)
 
-            if debit_amount:
-                cost = float(debit_amount)
-                transaction_type = "Debit"
-            elif credit_amount:
-                cost = float(credit_amount)
-                transaction_type = "Credit"
-            else:
-                continue  # Skip if no amount
+            if database is None:
+                return sum(len(batch) for batch in parsed_batches())
+
+            def file_info():
+                digest = hashlib.blake2b()
+                with memoryview(buffer) as view:
+                    for offset in range(start, end, HASH_CHUNK_SIZE):
+                        digest.update(view[offset:min(offset + HASH_CHUNK_SIZE, end)])
+                day_offset = last_day_offset(buffer, start, end, bank_format, delimiter, encoding)
+                return {'content_hash': digest.hexdigest(), 'file_size': end - start, 'byte_offset': end,
+                        'day_offset': day_offset, 'tail_hash': hashlib.blake2b(buffer[day_offset:end]).hexdigest()}
 
-            price_cat = price_categorization(cost)
-            vendor = vendor_finder(description)
+            return database.add_expenses_bulk(parsed_batches(), file_path=path, file_info=file_info, account=account)
 
-            print(f"{year_month} - ${cost:.2f} - {price_cat} - {transaction_type} - {vendor}")
-            database.add_expense(year_month, cost, price_cat, transaction_type, vendor)
-            records_added += 1
+def watch_folder(folder, database, interval=WATCH_INTERVAL, stop=None, batch_size=BATCH_SIZE, progress=None,
+                 account=DEFAULT_ACCOUNT, errors=None):
+    """Keep importing new CSV files, and lines appended to imported ones, into account until stop (an Event) is set.
 
-        database.log_import(path, records_added)
+    Each scan only stats the files; a file is read only when its size or modification time changed,
+    and then only from where its last import stopped, leaving a last line that is still being
+    written until it is finished. progress, when given, is called as
+    progress(path, records_added) for every file that was read. A file that fails to import is
+    rolled back and reported, as errors(path, exception) or on stderr when errors isn't given, and
+    tried again once it changes; the other files keep being watched.
+    """
+    seen = {}  # path -> (size, mtime) at the last scan
+
+    while True:
+        for path in find_csv_files(folder):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # Removed between the listing and now
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if seen.get(path) == signature:
+                continue
+
+            try:
+                records_added = process_csv(path, database, batch_size, account=account, follow=True)
+            except Exception as e:
+                seen[path] = signature
+                if errors is not None:
+                    errors(path, e)
+                else:
+                    print(f"Could not import {path}: {e}", file=sys.stderr)
+                continue
+            seen[path] = signature
+            if progress is not None:
+                progress(path, records_added)
 
-        return records_added
+        if stop is None:
+            time.sleep(interval)
+        elif stop.wait(interval):
+            return
@@ -1,26 +1,83 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 from database import ExpensesDB
-import matplotlib.pyplot as plt
-import numpy as np
+import instrumentation
+
+PATH_SEPARATOR = ';'  # Separates multiple files in the file path entry
+IMPORT_POLL_MS = 100  # How often the GUI checks the background import for progress
+PAGE_SIZE = 200  # Rows fetched per page on the All Expenses page
+PAGE_PREFETCH_AT = 0.9  # Load the next page once the scrollbar passes this fraction
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'June', 'July', 'Aug', 'Sept', 'Oct', 'Nov', 'Dec']
 
 class ExpenseApp:
     def __init__(self, root):
         self.back_command = None
         self.file_path_entry = None
+        self.status_label = None
+        self._import_thread = None
+        self._import_cancel = None
+        self._import_events = None
+        self._chart_figure = None  # Monthly summary chart, built on first visit and reused after that
+        self._chart_lines = None
+        self._chart_canvas = None
+        self._chart_data = {}  # year -> (debit totals, credit totals)
+        self._chart_generation = None
         self.db = ExpensesDB()
+        if os.environ.get('EXPENSE_ANALYZER_BACKEND', '').lower() == 'numpy':
+            from analytics import AnalyticsEngine  # Same report methods, answered from in-memory arrays
+            self.db = AnalyticsEngine(self.db)
+
         self.root = root
         self.root.title("Expense Analyzer 3000")
         self.root.geometry("900x600")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Opt-in timing of DB calls and page renders (see instrumentation.py for the env vars)
+        self.instrumentation = None
+        if instrumentation.enabled():
+            self.instrumentation = instrumentation.Instrumentation()
+            self.instrumentation.attach_db(self.db)
+            self.instrumentation.attach_app(self)  # Needs self.root, to time Tk's layout pass
+            self.root.bind('<Control-Shift-D>', lambda e: self.show_diagnostics())  # Hidden diagnostics page
 
         self.container = tk.Frame(root)
         self.container.pack(fill='both', expand=True)
 
         self.show_import_page()
 
+    def on_close(self):
+        """Close the database connections cleanly before the window goes away.
+
+        A running import is cancelled first. Closing the database waits for the import's transaction,
+        so the window is hidden straight away and the worker is waited for from the Tk loop.
+        """
+        if self._import_running():
+            self._import_cancel.set()  # The worker rolls back at its next progress report
+            self.root.withdraw()
+            self._close_after(self._import_thread)
+            return
+
+        dump_path = os.environ.get('EXPENSE_ANALYZER_PROFILE_JSON')
+        if self.instrumentation is not None and dump_path:
+            self.instrumentation.dump(dump_path)
+        self.db.close()
+        self.root.destroy()
+
+    def _close_after(self, thread):
+        if thread.is_alive():
+            self.root.after(IMPORT_POLL_MS, self._close_after, thread)
+        else:
+            self.on_close()
+
     def clear_frame(self):
         for widget in self.container.winfo_children():
             widget.destroy()
+        self._chart_canvas = None
 
     # ── Import page ────────────────────────────────────────────────────────────
 
@@ -37,7 +94,7 @@ class ExpenseApp:
 
         tk.Label(
             self.container,
-            text="Paste/Browse for the file path to your CSV file below and click 'Process File'",
+            text="Paste/Browse for your CSV file(s) or a folder of them below and click 'Process File'",
             font=('Arial', 12),
             fg='gray'
         ).pack(pady=10)
@@ -56,17 +113,23 @@ class ExpenseApp:
         tk.Button(
             input_frame, text="Browse...", command=self.browse_file,
             font=('Arial', 9), bg='#9E9E9E', fg='white', cursor='hand2'
-        ).grid(row=0, column=2, padx=15, pady=10)
+        ).grid(row=0, column=2, padx=(15, 5), pady=10)
+
+        tk.Button(
+            input_frame, text="Folder...", command=self.browse_folder,
+            font=('Arial', 9), bg='#9E9E9E', fg='white', cursor='hand2'
+        ).grid(row=0, column=3, padx=(5, 15), pady=10)
 
         # ── Action buttons ──────────────────────────────────────────────────────
         button_frame = tk.Frame(self.container)
         button_frame.pack(pady=10)
 
-        tk.Button(
+        self.process_button = tk.Button(
             button_frame, text="🔍 Process File", command=self.process_file,
             font=('Arial', 14), bg='#4CAF50', fg='white', cursor='hand2',
             width=20, height=2
-        ).pack(side='left', padx=10)
+        )
+        self.process_button.pack(side='left', padx=10)
 
         tk.Button(
             button_frame, text="Skip to Menu →", command=self.show_main_menu,
@@ -84,15 +147,33 @@ class ExpenseApp:
         self.status_label = tk.Label(self.container, text="", font=('Arial', 11), fg='green')
         self.status_label.pack(pady=8)
 
+        # Progress widgets, only packed while an import is running
+        self.progress_bar = ttk.Progressbar(self.container, orient='horizontal', mode='determinate')
+        self.cancel_button = tk.Button(
+            self.container, text="✖ Cancel Import", command=self.cancel_import,
+            font=('Arial', 10), bg='#9E9E9E', fg='white', cursor='hand2'
+        )
+
+        if self._import_running():  # Came back to this page mid-import
+            self.process_button.config(state='disabled')
+            self.progress_bar.pack(fill='x', padx=120, pady=(0, 4))
+            self.cancel_button.pack(pady=(0, 8))
+
         # ── Submitted files list ────────────────────────────────────────────────
-        self._build_submitted_files_panel()
+        # Filled in once the page is on screen, so the window never waits on the database to appear
+        panel_holder = tk.Frame(self.container)
+        panel_holder.pack(fill='x')
+        self.root.after_idle(lambda: self._build_submitted_files_panel(panel_holder))
 
-    def _build_submitted_files_panel(self):
+    def _build_submitted_files_panel(self, holder):
         """Show every CSV that has been imported, pulled from the DB."""
-        imported = self.db.get_imported_files()   # [(file_path, records_added, imported_at), ...]
+        if not holder.winfo_exists():
+            return  # The user already moved on to another page
+
+        imported = self.db.get_imported_files()   # [(file_path, records_added, imported_at, skipped, account), ...]
 
         panel = tk.LabelFrame(
-            self.container,
+            holder,
             text="  📂 Submitted Files  ",
             font=('Arial', 11, 'bold'),
             fg='#333',
@@ -121,10 +202,13 @@ class ExpenseApp:
         canvas.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
 
-        for file_path, records_added, imported_at in imported:
+        for file_path, records_added, imported_at, duplicates_skipped, account in imported:
             # Trim the timestamp to just the date + time (drop microseconds if present)
             when = imported_at[:16]  # "YYYY-MM-DD HH:MM"
             short_path = file_path if len(file_path) <= 55 else '…' + file_path[-54:]
+            if account:
+                short_path += f"  [{account}]"
+            skipped = f", {duplicates_skipped} duplicates skipped" if duplicates_skipped else ""
 
             row = tk.Frame(inner)
             row.pack(fill='x', pady=1)
@@ -139,7 +223,7 @@ class ExpenseApp:
 
             tk.Label(
                 row,
-                text=f"  {records_added} records  |  {when}",
+                text=f"  {records_added} records{skipped}  |  {when}",
                 font=('Arial', 10),
                 fg='gray',
                 anchor='e'
@@ -149,6 +233,10 @@ class ExpenseApp:
 
     def confirm_clear_database(self):
         """Show a confirmation dialog before wiping the DB."""
+        if self._import_running():
+            self.status_label.config(text="⚠️ Wait for the current import to finish first", fg='red')
+            return
+
         confirmed = messagebox.askyesno(
             title="Clear Database",
             message="This will permanently delete ALL expense records and the import history.\n\nAre you sure?",
@@ -164,42 +252,163 @@ class ExpenseApp:
 
     def browse_file(self):
         from tkinter import filedialog
-        filename = filedialog.askopenfilename(
-            title="Select CSV File",
+        filenames = filedialog.askopenfilenames(
+            title="Select CSV File(s)",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
         )
-        if filename:
+        if filenames:
+            self.file_path_entry.delete(0, tk.END)
+            self.file_path_entry.insert(0, PATH_SEPARATOR.join(filenames))
+
+    def browse_folder(self):
+        from tkinter import filedialog
+        folder = filedialog.askdirectory(title="Select a Folder of CSV Files")
+        if folder:
             self.file_path_entry.delete(0, tk.END)
-            self.file_path_entry.insert(0, filename)
+            self.file_path_entry.insert(0, folder)
 
     def process_file(self):
-        file_path = self.file_path_entry.get().strip()
+        paths = [p.strip() for p in self.file_path_entry.get().split(PATH_SEPARATOR) if p.strip()]
 
-        if not file_path:
+        if not paths:
             self.status_label.config(text="⚠️ Please enter a file path", fg='red')
             return
 
+        if self._import_running():
+            return
+
+        self.status_label.config(text="⏳ Processing file...", fg='orange')
+        self.process_button.config(state='disabled')
+        self.progress_bar.config(value=0, maximum=1)
+        self.progress_bar.pack(fill='x', padx=120, pady=(0, 4))
+        self.cancel_button.pack(pady=(0, 8))
+
+        # The import runs on a worker thread and reports back through a queue that the Tk loop polls
+        self._import_events = queue.Queue()
+        self._import_cancel = threading.Event()
+        self._import_started = time.perf_counter()
+        self._import_thread = threading.Thread(
+            target=self._run_import,
+            args=(paths, self._import_events, self._import_cancel),
+            daemon=True
+        )
+        self._import_thread.start()
+        self.root.after(IMPORT_POLL_MS, self._poll_import)
+
+    def _import_running(self):
+        return self._import_thread is not None and self._import_thread.is_alive()
+
+    def cancel_import(self):
+        if self._import_cancel is not None:
+            self._import_cancel.set()
+            self.cancel_button.config(state='disabled', text="Cancelling...")
+
+    def _run_import(self, paths, events, cancel):
+        """Worker thread: run the import and post ('progress' | 'done' | 'cancelled' | 'error', ...) events."""
+        from FileScrape import ImportCancelled, find_csv_files, process_csv, process_files
+
+        def on_progress(records, bytes_read, total_bytes):
+            if cancel.is_set():
+                raise ImportCancelled()  # Unwinds through add_expenses_bulk, which rolls back
+            events.put(('progress', records, bytes_read, total_bytes))
+
         try:
-            from FileScrape import process_csv
+            if len(paths) == 1 and not os.path.isdir(paths[0]):
+                records_added = process_csv(paths[0], self.db, progress=on_progress)
+            else:
+                files = find_csv_files(paths)
+                sizes = {path: os.path.getsize(path) for path in files}
+                total_bytes = sum(sizes.values())
+                done = {'records': 0, 'bytes': 0}
+
+                def on_file_done(path, records_added, files_done, files_total):
+                    done['records'] += records_added
+                    done['bytes'] += sizes[path]
+                    events.put(('progress', done['records'], done['bytes'], total_bytes))
+
+                # process_files checks cancel itself, before each write, so committed files are known
+                records_added = sum(process_files(files, self.db, progress=on_file_done, cancel=cancel).values())
+
+            events.put(('done', records_added))
+
+        except ImportCancelled as e:
+            events.put(('cancelled', sum(1 for added in e.results.values() if added), sum(e.results.values())))
+        except FileNotFoundError:
+            events.put(('error', "❌ File not found. Check the path and try again."))
+        except Exception as e:
+            events.put(('error', f"❌ Error: {str(e)}"))
+
+    def _poll_import(self):
+        """Drain the import queue on the Tk thread and update the progress widgets."""
+        on_import_page = self.status_label is not None and self.status_label.winfo_exists()
+        finished = None
+
+        while True:
+            try:
+                event = self._import_events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event[0] == 'progress':
+                _, records, bytes_read, total_bytes = event
+                if on_import_page:
+                    self._show_import_progress(records, bytes_read, total_bytes)
+            else:
+                finished = event
+
+        if finished is None:
+            self.root.after(IMPORT_POLL_MS, self._poll_import)
+            return
 
-            self.status_label.config(text="⏳ Processing file...", fg='orange')
-            self.root.update()
+        self._import_thread = None
+        self._import_cancel = None
 
-            records_added = process_csv(file_path, self.db)
+        if not on_import_page:  # They moved on during the import; don't pull them back
+            return
 
+        if finished[0] == 'done':
             self.show_import_page()
-            self.root.update()  # ← let the page finish rendering before touching status_label
             self.status_label.config(
-                text=f"✅ Success! Added {records_added} records to database",
+                text=f"✅ Success! Added {finished[1]} records to database",
                 fg='green'
             )
+            self.root.after(1500, self._leave_import_page)
+        else:
+            self._reset_import_controls()
+            if finished[0] == 'cancelled':
+                _, files_kept, records_kept = finished
+                if records_kept:
+                    self.status_label.config(
+                        text=f"✖ Import cancelled. {records_kept} records from {files_kept} file(s) "
+                             f"imported before the cancel were kept.",
+                        fg='gray'
+                    )
+                else:
+                    self.status_label.config(text="✖ Import cancelled. No records were added.", fg='gray')
+            else:
+                self.status_label.config(text=finished[1], fg='red')
+
+    def _leave_import_page(self):
+        # Only move on to the menu if nobody has navigated somewhere else in the meantime
+        if self.status_label is not None and self.status_label.winfo_exists():
+            self.show_main_menu()
+
+    def _show_import_progress(self, records, bytes_read, total_bytes):
+        elapsed = time.perf_counter() - self._import_started
+        rate = records / elapsed if elapsed > 0 else 0
+        eta = elapsed * (total_bytes - bytes_read) / bytes_read if bytes_read else 0
+
+        self.progress_bar.config(maximum=max(total_bytes, 1), value=bytes_read)
+        self.status_label.config(
+            text=f"⏳ {records:,} rows  |  {rate:,.0f} rows/sec  |  ETA {eta:,.0f}s",
+            fg='orange'
+        )
 
-            self.root.after(1500, self.show_main_menu)
-
-        except FileNotFoundError:
-            self.status_label.config(text="❌ File not found. Check the path and try again.", fg='red')
-        except Exception as e:
-            self.status_label.config(text=f"❌ Error: {str(e)}", fg='red')
+    def _reset_import_controls(self):
+        self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
+        self.cancel_button.config(state='normal', text="✖ Cancel Import")
+        self.process_button.config(state='normal')
 
     # ── Main menu ──────────────────────────────────────────────────────────────
 
@@ -249,6 +458,53 @@ class ExpenseApp:
     # ── Generic results page ───────────────────────────────────────────────────
 
     def create_result_page(self, title, columns, data, back_command=None):
+        tree = self._build_result_tree(title, columns, back_command)
+
+        for row in data:
+            tree.insert('', 'end', values=row)
+
+        tk.Label(
+            self.container,
+            text=f"Total Results: {len(data)}",
+            font=('Arial', 12), fg='gray'
+        ).pack(pady=10)
+
+    def create_paged_result_page(self, title, columns, fetch_page, format_row, total, back_command=None):
+        """Result page that pulls rows a page at a time as the user scrolls toward the bottom.
+
+        fetch_page(after_id) returns the next page of raw rows (id first), format_row turns one into
+        Treeview values. Opening the page only costs one page, no matter how big the table is.
+        """
+        tree = self._build_result_tree(title, columns, back_command)
+        count_label = tk.Label(self.container, font=('Arial', 12), fg='gray')
+        count_label.pack(pady=10)
+
+        state = {'last_id': 0, 'loaded': 0, 'done': False, 'pending': False}
+        scrollbar = tree.scrollbar
+
+        def load_page():
+            state['pending'] = False
+            rows = fetch_page(state['last_id'])
+            for row in rows:
+                tree.insert('', 'end', values=format_row(row))
+            if rows:
+                state['last_id'] = rows[-1][0]
+                state['loaded'] += len(rows)
+            state['done'] = len(rows) < PAGE_SIZE
+            count_label.config(text=f"Showing {state['loaded']:,} of {total:,} Results")
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            # Fetch the next page once the viewport gets close to the end of what's loaded
+            if not state['done'] and not state['pending'] and float(last) >= PAGE_PREFETCH_AT:
+                state['pending'] = True
+                tree.after_idle(load_page)
+
+        tree.configure(yscrollcommand=on_scroll)
+        load_page()
+
+    def _build_result_tree(self, title, columns, back_command=None):
+        """Header, back button and an empty Treeview for a results page. Returns the tree."""
         self.clear_frame()
 
         header = tk.Frame(self.container)
@@ -277,21 +533,14 @@ class ExpenseApp:
             yscrollcommand=scrollbar.set, height=20
         )
         scrollbar.config(command=tree.yview)
+        tree.scrollbar = scrollbar
 
         for col in columns:
             tree.heading(col, text=col)
             tree.column(col, anchor='center', width=150)
 
         tree.pack(fill='both', expand=True)
-
-        for row in data:
-            tree.insert('', 'end', values=row)
-
-        tk.Label(
-            self.container,
-            text=f"Total Results: {len(data)}",
-            font=('Arial', 12), fg='gray'
-        ).pack(pady=10)
+        return tree
 
     # ── Query pages ────────────────────────────────────────────────────────────
 
@@ -375,31 +624,25 @@ class ExpenseApp:
                 ).pack(pady=100)
                 return
 
-            tk.Label(
-                self.container,
-                text="Select a year to view monthly spending:",
-                font=('Arial', 14), fg='gray'
-            ).pack(pady=40)
-
             dropdown_frame = tk.Frame(self.container)
-            dropdown_frame.pack(pady=20)
+            dropdown_frame.pack(pady=(0, 10))
 
             tk.Label(dropdown_frame, text="Year:", font=('Arial', 14)).pack(side='left', padx=10)
 
             self.selected_year = tk.StringVar(value=str(years[0]))
 
-            ttk.Combobox(
+            year_box = ttk.Combobox(
                 dropdown_frame, textvariable=self.selected_year,
                 values=[str(y) for y in years],
                 state='readonly', font=('Arial', 14), width=15
-            ).pack(side='left', padx=10)
+            )
+            year_box.pack(side='left', padx=10)
+            year_box.bind('<<ComboboxSelected>>', lambda e: self.show_monthly_chart(int(self.selected_year.get())))
 
-            tk.Button(
-                self.container, text="📊 View Chart",
-                command=lambda: self.show_monthly_chart(int(self.selected_year.get())),
-                font=('Arial', 14), width=20, height=2,
-                bg='#4CAF50', fg='white', cursor='hand2'
-            ).pack(pady=30)
+            chart_frame = tk.Frame(self.container)
+            chart_frame.pack(fill='both', expand=True, padx=20, pady=(0, 20))
+            self._embed_monthly_chart(chart_frame)
+            self.show_monthly_chart(years[0])
 
         except AttributeError:
             tk.Label(
@@ -408,45 +651,107 @@ class ExpenseApp:
                 font=('Arial', 14), fg='red', justify='center'
             ).pack(pady=100)
 
+    def _embed_monthly_chart(self, master):
+        """Put the monthly chart in master. The Figure and its lines are only ever built once."""
+        from matplotlib.figure import Figure  # Loaded on first use, it's the slowest import in the app
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        if self._chart_figure is None:
+            # A plain Figure rather than pyplot, so nothing is registered globally and no window opens
+            figure = Figure(figsize=(8, 4), dpi=100)
+            axes = figure.add_subplot()
+            months = range(12)
+            debit_line, = axes.plot(months, [0.0] * 12, 'o--r', label='Debit')
+            credit_line, = axes.plot(months, [0.0] * 12, 'o--g', label='Credit')
+            axes.set_xticks(months)
+            axes.set_xticklabels(MONTH_LABELS)
+            axes.set_xlabel("Month")
+            axes.set_ylabel("Total ($)")
+            axes.legend()
+            axes.grid(axis='x')
+            self._chart_figure = figure
+            self._chart_lines = (debit_line, credit_line)
+
+        # The canvas widget goes away with the page, the Figure is just attached to the new one
+        self._chart_canvas = FigureCanvasTkAgg(self._chart_figure, master=master)
+        self._chart_canvas.get_tk_widget().pack(fill='both', expand=True)
+
+    def _monthly_totals(self, year):
+        """(debit totals, credit totals) for Jan..Dec, cached per year until the data changes."""
+        generation = self.db.data_generation()
+        if generation != self._chart_generation:
+            self._chart_data.clear()
+            self._chart_generation = generation
+
+        totals = self._chart_data.get(year)
+        if totals is None:
+            debit_totals = [0.0] * 12
+            credit_totals = [0.0] * 12
+            for month, trans_type, cost in self.db.monthly_debit_credit_given_year(year):
+                if 'Debit' in trans_type:
+                    debit_totals[int(month) - 1] = cost
+                if 'Credit' in trans_type:
+                    credit_totals[int(month) - 1] = cost
+            totals = self._chart_data[year] = (debit_totals, credit_totals)
+        return totals
+
     def show_monthly_chart(self, year):
-        expenses = self.db.monthly_debit_credit_given_year(year)
-
-        debit_totals = {f"{i:02d}": 0 for i in range(1, 13)}
-        credit_totals = {f"{i:02d}": 0 for i in range(1, 13)}
-
-        for month, trans_type, cost in expenses:
-            if 'Debit' in trans_type:
-                debit_totals[month] = cost
-            if 'Credit' in trans_type:
-                credit_totals[month] = cost
-
-        x_array = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'June', 'July', 'Aug', 'Sept', 'Oct', 'Nov', 'Dec'])
-        y_debit = [debit_totals[f"{i:02d}"] for i in range(1, 13)]
-        y_credit = [credit_totals[f"{i:02d}"] for i in range(1, 13)]
-
-        plt.plot(x_array, y_debit,  'o--r', label='Debit')
-        plt.plot(x_array, y_credit, 'o--g', label='Credit')
-        plt.title(f"Total Debit/Credit Spending Per Month - {year}")
-        plt.xlabel("Month")
-        plt.ylabel("Total ($)")
-        plt.legend()
-        plt.grid(axis='x')
-        plt.show()
+        """Redraw the embedded chart for year by swapping the line data in place."""
+        if self._chart_canvas is None:
+            return
+
+        debit_totals, credit_totals = self._monthly_totals(year)
+        debit_line, credit_line = self._chart_lines
+        debit_line.set_ydata(debit_totals)
+        credit_line.set_ydata(credit_totals)
+
+        axes = debit_line.axes
+        axes.set_title(f"Total Debit/Credit Spending Per Month - {year}")
+        axes.relim()
+        axes.autoscale_view()
+        self._chart_canvas.draw_idle()
 
     # ── All expenses ───────────────────────────────────────────────────────────
 
     def show_all_expenses(self):
         try:
-            expenses = self.db.all_expenses()
-            data = [(e[1], f"${e[2]:.2f}", e[3], e[4], e[5]) for e in expenses]
-            self.create_result_page(
+            self.create_paged_result_page(
                 "All Expenses",
                 ('Date', 'Cost', 'Category', 'Type', 'Vendor'),
-                data, back_command=self.show_main_menu
+                fetch_page=lambda after_id: self.db.expenses_page(after_id, PAGE_SIZE),
+                format_row=lambda e: (e[1], f"${e[2]:.2f}", e[3], e[4], e[5]),
+                total=self.db.expense_count(),
+                back_command=self.show_main_menu
             )
         except AttributeError:
             self.show_placeholder("All Expenses")
 
+    def show_diagnostics(self):
+        """Timing histograms and slow-query plans collected by the instrumentation layer."""
+        if self.instrumentation is None:
+            return
+
+        data = [
+            (name, stats['calls'], stats['p50_ms'], stats['p95_ms'], stats['max_ms'], stats['inner_ms_avg'],
+             stats['rows_avg'] if stats['rows_avg'] is not None else '')
+            for name, stats in self.instrumentation.summary().items()
+        ]
+        self.create_result_page(
+            "🩺 Diagnostics",
+            ('Name', 'Calls', 'p50 ms', 'p95 ms', 'Max ms', 'Nested/DB ms', 'Avg Rows'),
+            data, back_command=self.show_main_menu
+        )
+
+        slow = tk.Text(self.container, height=8, font=('Courier', 9), wrap='none')
+        slow.pack(fill='x', padx=20, pady=(0, 10))
+        for call in reversed(self.instrumentation.slow_calls):
+            slow.insert('end', f"{call['name']}  {call['ms']:.1f} ms\n")
+            for statement in call['statements']:
+                slow.insert('end', f"    {' '.join(statement['sql'].split())[:150]}\n")
+                for step in statement['plan'] or []:
+                    slow.insert('end', f"        {step}\n")
+        slow.config(state='disabled')
+
     def show_placeholder(self, query_name):
         self.clear_frame()
         tk.Label(
@@ -532,11 +837,13 @@ class ExpenseApp:
         canvas.bind('<Leave>', lambda e: canvas.unbind_all('<MouseWheel>'))
 
         # ── Sections ─────────────────────────────────────────────────────────────
+        stats = self.db.dashboard_stats()  # One call feeds every card on the page
+
         self._sum_row = 0
-        self._summary_add_totals()
-        self._summary_add_avg_debit_credit()
-        self._summary_add_avg_transactions_per_month()
-        self._summary_add_highlights()
+        self._summary_add_totals(stats)
+        self._summary_add_avg_debit_credit(stats)
+        self._summary_add_avg_transactions_per_month(stats)
+        self._summary_add_highlights(stats)
 
     # ── Summary helpers ────────────────────────────────────────────────────────
 
@@ -582,10 +889,11 @@ class ExpenseApp:
             self._sum_row += 1
         return self._sum_row
 
-    def _summary_add_totals(self):
+    def _summary_add_totals(self, stats):
         """Total spent, received, and transaction count."""
-        row = self.db.summary_totals()
-        total_spent, total_received, total_transactions = row if row else (None, None, None)
+        total_spent, total_received, total_transactions = (
+            stats.total_spent, stats.total_received, stats.total_transactions
+        )
 
         self._summary_section("💰  Totals")
         card_row = self._summary_next_row()
@@ -600,14 +908,9 @@ class ExpenseApp:
                            f"{total_transactions:,}" if total_transactions else "N/A",
                            col=2, row=card_row)
 
-    def _summary_add_avg_transactions_per_month(self):
+    def _summary_add_avg_transactions_per_month(self, stats):
         """Average number of debit and credit transactions per month."""
-        results = self.db.avg_transactions_per_month()
-
-        avgs = {'Debit': None, 'Credit': None}
-        for trans_type, avg in results:
-            if trans_type in avgs:
-                avgs[trans_type] = avg
+        avgs = {'Debit': stats.debits_per_month, 'Credit': stats.credits_per_month}
 
         self._summary_section("📅  Avg Transactions Per Month")
         card_row = self._summary_next_row()
@@ -619,47 +922,38 @@ class ExpenseApp:
                            f"{avgs['Credit']:.1f}" if avgs['Credit'] is not None else "N/A",
                            col=1, row=card_row, bg='#E8F5E9', fg='#1B5E20')
 
-    def _summary_add_highlights(self):
+    def _summary_add_highlights(self, stats):
         """Biggest purchase, top vendor, highest avg vendor."""
         self._summary_section("🏆  Highlights")
         card_row = self._summary_next_row()
 
-        biggest = self.db.largest_10_purchases()
-        if biggest:
-            vendor, cost = biggest[0][5], biggest[0][2]
+        if stats.biggest_purchase:
+            cost, vendor = stats.biggest_purchase
             self._summary_card("Biggest Purchase",
                                f"${cost:,.2f}\n{vendor}",
                                col=0, row=card_row, bg='#FFF8E1', fg='#E65100')
         else:
             self._summary_card("Biggest Purchase", "N/A", col=0, row=card_row)
 
-        top_vendor = self.db.total_purchase_vendor()
-        if top_vendor:
-            vendor, cost, visits = top_vendor[0]
+        if stats.most_visited:
+            vendor, visits = stats.most_visited
             self._summary_card("Most Visited",
                                f"{vendor}\n{visits} visits",
                                col=1, row=card_row, bg='#F3E5F5', fg='#4A148C')
         else:
             self._summary_card("Most Visited", "N/A", col=1, row=card_row)
 
-        high_avg = self.db.average_spending_by_vendor()
-        if high_avg:
-            vendor, avg_cost, count, total = high_avg[0]
+        if stats.highest_avg_vendor:
+            vendor, avg_cost = stats.highest_avg_vendor
             self._summary_card("Highest Avg Spend",
                                f"${avg_cost:,.2f}\n{vendor}",
                                col=2, row=card_row, bg='#E8EAF6', fg='#1A237E')
         else:
             self._summary_card("Highest Avg Spend", "N/A", col=2, row=card_row)
 
-    def _summary_add_avg_debit_credit(self):
+    def _summary_add_avg_debit_credit(self, stats):
         """Outlier-trimmed average debit vs credit card pair."""
-        results = self.db.average_debit_credit_overall()
-
-        # Parse whichever rows came back (order not guaranteed)
-        avgs = {'Debit': None, 'Credit': None}
-        for trans_type, cleaned_avg in results:
-            if trans_type in avgs:
-                avgs[trans_type] = cleaned_avg
+        avgs = {'Debit': stats.avg_debit, 'Credit': stats.avg_credit}
 
         self._summary_section("💳  Average Transaction")
 
@@ -672,8 +966,8 @@ class ExpenseApp:
         self._summary_card("Avg Credit", credit_val, col=1, row=card_row,
                            bg='#E8F5E9', fg='#1B5E20')
 
-
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for the import worker processes in the PyInstaller build
     root = tk.Tk()
     app = ExpenseApp(root)
     root.mainloop()
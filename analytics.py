@@ -0,0 +1,261 @@
+import functools
+import threading
+
+import numpy as np
+
+from database import CREDIT, DEBIT, TRIM_STDDEVS, DashboardStats
+
+class _Dictionary:
+    """Maps repeated strings (vendors, types, categories) to small integer codes and back."""
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def encode(self, values, dtype):
+        codes = self.codes
+        names = self.names
+        out = np.empty(len(values), dtype=dtype)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(names)
+                names.append(value)
+            out[i] = code
+        return out
+
+    def code(self, value):
+        return self.codes.get(value, -1)
+
+def _locked(method):
+    """Run method holding the engine's lock, so a refresh can't swap the arrays out from under a report."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _name_order(name):
+    """Sort key that orders names like SQLite's ORDER BY name (NULLs first, then by code point)."""
+    return (name is not None, name or '')
+
+class AnalyticsEngine:
+    """In-memory, NumPy-backed copy of the expenses table that answers the ExpensesDB reports.
+
+    Columns are held as compact typed arrays (int64 cents, int32 yyyymm, uint8 type/category codes
+    and dictionary-encoded int32 vendors) and every report is a vectorized pass over them. The arrays
+    are topped up with only the new rows whenever the database's data generation moves on.
+    Anything that isn't a report (imports, paging, import history, close...) falls through to the
+    wrapped ExpensesDB, so the GUI can use either object interchangeably. Reports can be called from
+    several threads at once (e.g. through AsyncExpensesDB); they take turns on the arrays.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._generation = None
+        self._lock = threading.RLock()  # Reentrant, as dashboard_stats runs the other reports
+        self._reset()
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def _reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.year_month = np.empty(0, dtype=np.int32)  # 2024-03 -> 202403
+        self.cents = np.empty(0, dtype=np.int64)  # Same integer cents as the table, so sums match it exactly
+        self.types = np.empty(0, dtype=np.uint8)
+        self.categories = np.empty(0, dtype=np.uint8)
+        self.vendors = np.empty(0, dtype=np.int32)
+        self.type_names = _Dictionary()
+        self.category_names = _Dictionary()
+        self.vendor_names = _Dictionary()
+
+    # ── Loading ────────────────────────────────────────────────────────────────
+
+    @_locked
+    def refresh(self):
+        """Bring the arrays up to date with the database, loading only rows added since the last refresh."""
+        generation = self.db.data_generation()
+        if generation == self._generation:
+            return
+
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # delete_database wipes every row and AUTOINCREMENT never reuses ids, so a different
+            # first id means the data was cleared and has to be loaded from scratch
+            cursor.execute('''SELECT MIN(id) FROM expenses''')
+            first_id = cursor.fetchone()[0]
+            if len(self.ids) and first_id != self.ids[0]:
+                self._reset()
+
+            last_id = int(self.ids[-1]) if len(self.ids) else 0
+            cursor.execute('''
+                SELECT id, year_month, cost_cents, price_category, transaction_type, vendor
+                FROM expense_rows
+                WHERE id > ?
+                ORDER BY id
+            ''', (last_id,))
+            rows = cursor.fetchall()
+
+        if rows:
+            ids, year_months, cents, categories, types, vendors = zip(*rows)
+            self.ids = np.concatenate([self.ids, np.array(ids, dtype=np.int64)])
+            self.year_month = np.concatenate([self.year_month, np.array(
+                [int(ym[:4]) * 100 + int(ym[5:7]) for ym in year_months], dtype=np.int32)])
+            self.cents = np.concatenate([self.cents, np.array(cents, dtype=np.int64)])
+            self.categories = np.concatenate([self.categories, self.category_names.encode(categories, np.uint8)])
+            self.types = np.concatenate([self.types, self.type_names.encode(types, np.uint8)])
+            self.vendors = np.concatenate([self.vendors, self.vendor_names.encode(vendors, np.int32)])
+
+        self._generation = generation
+
+    def _debits(self):
+        return self.types == self.type_names.code(DEBIT)
+
+    @staticmethod
+    def _format_year_month(value):
+        return f"{value // 100:04d}-{value % 100:02d}"
+
+    # ── Reports (same names and row shapes as ExpensesDB) ─────────────────────
+
+    @_locked
+    def expense_count(self):
+        self.refresh()
+        return len(self.ids)
+
+    @_locked
+    def get_available_years(self):
+        self.refresh()
+        return [int(year) for year in np.unique(self.year_month // 100)[::-1]]
+
+    @_locked
+    def monthly_debit_credit_given_year(self, year):
+        self.refresh()
+        in_year = (self.year_month // 100) == int(year)
+        months = self.year_month[in_year] % 100
+        types = self.types[in_year]
+
+        keys, inverse = np.unique(months.astype(np.int32) * 256 + types, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.cents[in_year], minlength=len(keys))
+
+        rows = [(f"{key // 256:02d}", self.type_names.names[key % 256], float(total) / 100)
+                for key, total in zip(keys.tolist(), totals)]
+        return sorted(rows, key=lambda row: (row[0], row[1]))
+
+    @_locked
+    def largest_10_purchases(self):
+        self.refresh()
+        candidates = np.flatnonzero(self._debits())
+        if len(candidates) > 10:
+            candidates = candidates[np.argpartition(self.cents[candidates], -10)[-10:]]
+        top = candidates[np.argsort(self.cents[candidates], kind='stable')[::-1]]
+
+        return [(int(self.ids[i]), self._format_year_month(int(self.year_month[i])), int(self.cents[i]) / 100,
+                 self.category_names.names[self.categories[i]], self.type_names.names[self.types[i]],
+                 self.vendor_names.names[self.vendors[i]]) for i in top]
+
+    @_locked
+    def total_debits_credits(self):
+        self.refresh()
+        totals = np.bincount(self.types, weights=self.cents, minlength=len(self.type_names.names))
+        counts = np.bincount(self.types, minlength=len(self.type_names.names))
+
+        rows = [(name, float(total) / 100) for name, total, count in zip(self.type_names.names, totals, counts) if count]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def _grouped(self, codes, names, mask):
+        """(name, dollar sum, count) per code present under mask."""
+        size = len(names.names)
+        totals = np.bincount(codes[mask], weights=self.cents[mask], minlength=size)
+        counts = np.bincount(codes[mask], minlength=size)
+        present = np.flatnonzero(counts)
+        return [(names.names[code], float(totals[code]) / 100, int(counts[code])) for code in present]
+
+    @_locked
+    def total_purchase_categories(self):
+        self.refresh()
+        rows = self._grouped(self.categories, self.category_names, self._debits())
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    @_locked
+    def total_purchase_vendor(self):
+        self.refresh()
+        rows = self._grouped(self.vendors, self.vendor_names, self._debits())
+        return sorted(rows, key=lambda row: (-row[2], _name_order(row[0])))
+
+    @_locked
+    def total_year_over_year(self):
+        self.refresh()
+        debits = self._debits()
+        years, inverse = np.unique(self.year_month[debits] // 100, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.cents[debits], minlength=len(years))
+        counts = np.bincount(inverse, minlength=len(years))
+
+        rows = [(str(int(year)), float(total) / 100, int(count)) for year, total, count in zip(years, totals, counts)]
+        return rows[::-1]
+
+    @_locked
+    def average_spending_by_vendor(self, min_transactions=5):
+        self.refresh()
+        rows = [(vendor, total / count, count, total)
+                for vendor, total, count in self._grouped(self.vendors, self.vendor_names, self._debits())
+                if count >= min_transactions]
+        # Averaged from whole cents, as the SQL does, so equal averages tie exactly and fall back to the name
+        return sorted(rows, key=lambda row: (-round(row[3] * 100) / row[2], _name_order(row[0])))
+
+    @_locked
+    def average_debit_credit_overall(self, stddevs=TRIM_STDDEVS):
+        self.refresh()
+        results = []
+        for code, name in sorted(enumerate(self.type_names.names), key=lambda item: item[1]):
+            cents = self.cents[self.types == code]
+            if not len(cents):
+                continue
+            mean = cents.mean()
+            spread = stddevs * cents.std()  # Population std, same as the SQL version
+            kept = cents[(cents >= mean - spread) & (cents <= mean + spread)]
+            if len(kept) > 1:
+                results.append((name, int(kept.sum()) / len(kept) / 100))
+        return results
+
+    @_locked
+    def summary_totals(self):
+        self.refresh()
+        if not len(self.ids):
+            return None, None, 0
+        totals = dict(self.total_debits_credits())
+        return totals.get(DEBIT, 0.0), totals.get(CREDIT, 0.0), len(self.ids)
+
+    @_locked
+    def avg_transactions_per_month(self):
+        self.refresh()
+        results = []
+        for code, name in sorted(enumerate(self.type_names.names), key=lambda item: item[1]):
+            months = self.year_month[self.types == code]
+            if len(months):
+                results.append((name, len(months) / len(np.unique(months))))
+        return results
+
+    @_locked
+    def dashboard_stats(self, min_transactions=5):
+        self.refresh()
+        total_spent, total_received, total_transactions = self.summary_totals()
+        trimmed = dict(self.average_debit_credit_overall())
+        per_month = dict(self.avg_transactions_per_month())
+        biggest = self.largest_10_purchases()[:1]
+        vendors = self.total_purchase_vendor()
+        averages = self.average_spending_by_vendor(min_transactions)
+
+        return DashboardStats(
+            total_spent=total_spent,
+            total_received=total_received,
+            total_transactions=total_transactions,
+            avg_debit=trimmed.get(DEBIT),
+            avg_credit=trimmed.get(CREDIT),
+            debits_per_month=per_month.get(DEBIT),
+            credits_per_month=per_month.get(CREDIT),
+            biggest_purchase=(biggest[0][2], biggest[0][5]) if biggest else None,
+            most_visited=(vendors[0][0], vendors[0][2]) if vendors else None,
+            highest_avg_vendor=(averages[0][0], averages[0][1]) if averages else None,
+        )
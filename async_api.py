@@ -0,0 +1,152 @@
+"""asyncio front end for embedding the analyzer in a service (e.g. a small local HTTP API).
+
+Every ExpensesDB method is available as a coroutine on AsyncExpensesDB:
+
+    async with AsyncExpensesDB('expenses.db') as db:
+        added = await process_csv_async('statement.csv', db)
+        vendors = await db.total_purchase_vendor()
+
+The SQLite work runs on the AsyncExpensesDB's own thread pool, never on the event loop, and at most
+max_workers calls run at once; the rest wait on the loop without tying up a thread. Concurrent
+requests for the same report share one query, and ExpensesDB's result cache answers repeats after it.
+"""
+import asyncio
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DEFAULT_ACCOUNT, ExpensesDB
+from FileScrape import BATCH_SIZE, ImportCancelled, LineReader, already_imported, parse_csv, resume_offset
+
+MAX_WORKERS = 4  # SQLite calls running at once; reads run in parallel, writes still queue on the writer lock
+QUEUE_BATCHES = 4  # Parsed batches process_csv_async lets the parser get ahead of the writer
+
+# Reports that only read and are cached by ExpensesDB, so identical in-flight calls can share one result
+SHARED_CALLS = frozenset(name for name, member in vars(ExpensesDB).items() if getattr(member, 'cached_query', False))
+
+class AsyncExpensesDB:
+    """Coroutine versions of an ExpensesDB's methods, run on a dedicated, bounded thread pool.
+
+    db can be a database file name or an already open ExpensesDB (or AnalyticsEngine). Results of
+    shared report calls are handed to every caller, so treat them as read-only.
+    """
+
+    def __init__(self, db='expenses.db', max_workers=MAX_WORKERS):
+        self.db = ExpensesDB(db) if isinstance(db, str) else db
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='expenses-db')
+        self._semaphore = None  # Made on first use, so it belongs to the loop that's running then
+        self._in_flight = {}  # (method, args) -> future of the call every identical caller awaits
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.db, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            if name in SHARED_CALLS:
+                return await self._shared(name, args, kwargs)
+            return await self.run(attribute, *args, **kwargs)
+        return call
+
+    async def run(self, func, *args, **kwargs):
+        """Await func(*args, **kwargs) run on the database thread pool."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _shared(self, name, args, kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.run(getattr(self.db, name), *args, **kwargs))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)  # One caller giving up doesn't cancel the query for the others
+
+    async def close(self):
+        await self.run(self.db.close)
+        self._executor.shutdown()
+
+async def process_csv_async(path, db, batch_size=BATCH_SIZE, progress=None, queue_batches=QUEUE_BATCHES,
+                            account=DEFAULT_ACCOUNT):
+    """process_csv for an AsyncExpensesDB: returns the number of records added, without blocking the event loop.
+
+    The file is parsed on its own thread and written by the database thread pool at the same time,
+    with at most queue_batches batches between them, so a parser running ahead of the writer waits
+    instead of filling memory. progress, when given, is called on the event loop as
+    progress(records, bytes_read, total_bytes). Cancelling the coroutine rolls the import back.
+    """
+    start = await db.run(resume_offset, path, db.db, account)
+    if start is None or (start == 0 and await db.run(already_imported, path, db.db, account)):
+        return 0
+
+    loop = asyncio.get_running_loop()
+    reader = LineReader(path, start=start)
+    batches = queue.Queue(maxsize=queue_batches)
+    stop = threading.Event()
+    done = object()
+
+    def report(records, bytes_read, total_bytes):
+        loop.call_soon_threadsafe(progress, records, bytes_read, total_bytes)
+
+    def hand_over(item):
+        # Waits for room in the queue, but gives up once the writer has stopped taking batches
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def parse():
+        try:
+            for batch in parse_csv(path, batch_size, report if progress is not None else None, reader,
+                                   account=account):
+                if not hand_over(batch):
+                    return
+            hand_over(done)
+        except BaseException as exc:  # Handed to the writer, which rolls back and re-raises it
+            hand_over(exc)
+
+    def parsed_batches():
+        while True:
+            try:
+                item = batches.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    raise ImportCancelled(path)
+                continue
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            if stop.is_set():
+                raise ImportCancelled(path)
+            yield item
+
+    def write():
+        try:
+            return db.db.add_expenses_bulk(parsed_batches(), file_path=path, file_info=reader.file_info,
+                                           account=account)
+        finally:
+            stop.set()  # Lets the parser thread finish if the writer stopped early
+
+    parser = threading.Thread(target=parse, name='expenses-parse', daemon=True)
+    parser.start()
+    try:
+        return await db.run(write)
+    except asyncio.CancelledError:
+        stop.set()  # The write carries on in its thread until its next batch, then rolls back
+        raise
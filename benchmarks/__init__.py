@@ -0,0 +1,5 @@
+"""Reproducible ingest and query benchmarks for Expense Analyzer 3000.
+
+    python -m benchmarks.generate statements.csv --rows 1000000
+    python -m benchmarks.run --rows 10k --rows 1m --output results.json
+"""
@@ -0,0 +1,221 @@
+"""Run the ingest and query benchmarks and write machine-readable results.
+
+    python -m benchmarks.run --rows 10k --rows 1m --output results.json
+
+Every result records throughput (rows/sec) and/or latency percentiles plus peak RSS, alongside the
+Python/SQLite versions and seed, so two result files can be diffed run over run. Each benchmark runs
+in a fresh process, so its peak_rss_mb is its own rather than the largest of the ones before it
+(for process_large_csv it leaves out the parse workers; for the CLI/GUI startups it is the started
+interpreter's).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.generate import parse_rows, write_csv
+from database import ExpensesDB
+from FileScrape import LineReader, VendorExtractor, batched, parse_lines, process_csv, process_large_csv
+
+# Every report ExpensesDB caches plus the uncached pagers, so a new report can't slip past the benchmark
+PAGERS = ('all_expenses', 'expenses_page')
+REPORTS = sorted(name for name, member in vars(ExpensesDB).items() if getattr(member, 'cached_query', False)) \
+    + list(PAGERS)
+# Arguments for the reports that need them; the rest run with their defaults
+REPORT_ARGS = {
+    'monthly_debit_credit_given_year': None,  # Filled in with the newest year in the data
+    'expenses_page': (0, 200),
+}
+VENDOR_CHUNK = 100_000  # Descriptions held in memory at once by the vendor_finder benchmark
+
+def peak_rss_mb(children=False):
+    """Peak RSS of this process so far, or with children the largest of its finished child processes'."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)  # bytes on macOS, KiB elsewhere
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_result(name, rows, samples, peak_rss=None):
+    return {
+        'name': name,
+        'rows': rows,
+        'runs': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'peak_rss_mb': peak_rss if peak_rss is not None else peak_rss_mb(),
+    }
+
+def throughput_result(name, rows, seconds):
+    return {
+        'name': name,
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds) if seconds else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def _run_isolated(sender, func, args):
+    sender.send(func(*args))
+    sender.close()
+
+def isolated(func, *args):
+    """func(*args) run in a fresh interpreter, so the peak RSS it records is its own."""
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_isolated, args=(sender, func, args))
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:  # It died before sending a result back; its traceback is on stderr
+        process.join()
+        raise RuntimeError(f"{func.__name__} failed in its benchmark process (exit code {process.exitcode})") from None
+    finally:
+        process.join()
+        receiver.close()
+
+def bench_vendor_finder(csv_path, rows):
+    """Vendor extraction alone, uncached and through the LRU cache.
+
+    Descriptions are parsed VENDOR_CHUNK at a time, outside the timed loops, so memory stays flat at 10M rows.
+    """
+    lines = parse_lines(LineReader(csv_path))
+    extract = VendorExtractor().extract
+    finder = VendorExtractor()
+    uncached = cached = 0.0
+
+    for chunk in batched((description for _, description, *_ in lines), VENDOR_CHUNK):
+        start = time.perf_counter()
+        for description in chunk:
+            extract(description)
+        uncached += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for description in chunk:
+            finder(description)
+        cached += time.perf_counter() - start
+
+    results = [throughput_result('vendor_finder_uncached', rows, uncached),
+               throughput_result('vendor_finder', rows, cached)]
+    results[1]['cache'] = finder.cache_info()
+    return results
+
+def bench_import(name, csv_path, db_path):
+    importer = {'process_csv': process_csv, 'process_large_csv': process_large_csv}[name]
+    with ExpensesDB(db_path) as db:
+        start = time.perf_counter()
+        added = importer(csv_path, db)
+        return throughput_result(name, added, time.perf_counter() - start)
+
+def bench_report(db_path, name, rows, repeat):
+    with ExpensesDB(db_path) as db:
+        args = REPORT_ARGS.get(name, ())
+        if args is None:
+            years = db.get_available_years()
+            args = (years[0],) if years else (2024,)
+        method = getattr(db, name)
+
+        samples = []
+        for _ in range(repeat):
+            db.clear_cache()  # Time the query itself, not a cache hit
+            start = time.perf_counter()
+            method(*args)
+            samples.append(time.perf_counter() - start)
+        return latency_result(name, rows, samples)
+
+def startup_commands(db_path):
+    """Cold starts to time: fresh interpreters running the CLI against db_path and importing the GUI."""
+    commands = {'startup_cli': [sys.executable, 'cli.py', 'report', 'expense_count', '--db', db_path]}
+    try:
+        import tkinter  # noqa: F401
+        commands['startup_gui_import'] = [sys.executable, '-c', 'import GUI']
+    except ImportError:
+        pass
+    return commands
+
+def bench_startup_command(name, command, repeat):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(min(repeat, 10)):  # Each sample is a whole new process
+        start = time.perf_counter()
+        subprocess.run(command, cwd=repo_root, check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return latency_result(name, 0, samples, peak_rss_mb(children=True))
+
+def bench_startup_db(folder, db_path):
+    """Opening a new database vs the existing db_path."""
+    results = []
+    for name, path in (('startup_db_create', os.path.join(folder, 'startup_new.db')), ('startup_db_open', db_path)):
+        start = time.perf_counter()
+        with ExpensesDB(path) as db:
+            db.expense_count()
+        results.append(latency_result(name, 0, [time.perf_counter() - start]))
+    return results
+
+def run(sizes, repeat=20, seed=0, workdir=None):
+    results = []
+
+    with tempfile.TemporaryDirectory(dir=workdir) as folder:
+        startup_db = os.path.join(folder, 'startup.db')
+        results.extend(isolated(bench_startup_command, name, command, repeat)
+                       for name, command in startup_commands(startup_db).items())
+        results.extend(isolated(bench_startup_db, folder, startup_db))
+
+        for rows in sizes:
+            csv_path = os.path.join(folder, f'statement_{rows}.csv')
+            db_path = os.path.join(folder, f'bench_{rows}.db')
+            write_csv(csv_path, rows, seed)
+
+            results.extend(isolated(bench_vendor_finder, csv_path, rows))
+            results.append(isolated(bench_import, 'process_csv', csv_path, db_path))
+            results.extend(isolated(bench_report, db_path, name, rows, repeat) for name in REPORTS)
+            results.append(isolated(bench_import, 'process_large_csv', csv_path,
+                                    os.path.join(folder, f'bench_{rows}_mmap.db')))
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest and report speed on synthetic statements.")
+    parser.add_argument('--rows', type=parse_rows, action='append',
+                        help="Rows to generate, repeatable, e.g. --rows 10k --rows 1m --rows 10m (default 10k)")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per report for the latency percentiles")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help="Where to put the temporary CSV and database files")
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows or [10_000], args.repeat, args.seed, args.workdir)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+if __name__ == "__main__":
+    main()
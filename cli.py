@@ -0,0 +1,201 @@
+"""Headless command line interface for Expense Analyzer 3000.
+
+Imports CSV files and prints any report as CSV or JSON without touching tkinter or matplotlib,
+so it starts quickly and runs fine from cron or CI:
+
+    python cli.py import statements/ --workers 4
+    python cli.py import visa-2024.csv --account visa
+    python cli.py report total_purchase_vendor --format json
+    python cli.py report monthly_debit_credit_given_year 2024 --timings
+    python cli.py watch statements/ --interval 60
+"""
+import time
+
+_STARTED = time.perf_counter()  # Before the other imports, so --timings can show what startup costs
+
+import argparse
+import csv
+import inspect
+import json
+import sys
+
+from database import DEFAULT_ACCOUNT, ExpensesDB
+from FileScrape import (BATCH_SIZE, WATCH_INTERVAL, find_csv_files, process_csv, process_files, process_large_csv,
+                        watch_folder)
+
+# Report name -> column names for its rows (same order the ExpensesDB method returns them in)
+REPORTS = {
+    'get_available_years': ('year',),
+    'monthly_debit_credit_given_year': ('month', 'transaction_type', 'total'),
+    'all_expenses': ('id', 'year_month', 'cost', 'price_category', 'transaction_type', 'vendor'),
+    'largest_10_purchases': ('id', 'year_month', 'cost', 'price_category', 'transaction_type', 'vendor'),
+    'total_debits_credits': ('transaction_type', 'total'),
+    'total_purchase_categories': ('price_category', 'total', 'count'),
+    'total_purchase_vendor': ('vendor', 'total', 'count'),
+    'total_year_over_year': ('year', 'total', 'count'),
+    'average_spending_by_vendor': ('vendor', 'average', 'count', 'total'),
+    'average_debit_credit_overall': ('transaction_type', 'trimmed_average'),
+    'summary_totals': ('total_spent', 'total_received', 'total_transactions'),
+    'avg_transactions_per_month': ('transaction_type', 'average_per_month'),
+    'expense_count': ('count',),
+    'dashboard_stats': None,  # A NamedTuple, its fields are used as the columns
+    'get_imported_files': ('file_path', 'records_added', 'imported_at', 'duplicates_skipped', 'account'),
+}
+
+def _timed(label, timings, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings.append((label, time.perf_counter() - start))
+    return result
+
+def _parse_arg(value):
+    """Report arguments come in as strings; pass numbers through as numbers."""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+def _as_rows(name, result):
+    """Normalize any report result to (columns, list of rows)."""
+    columns = REPORTS[name]
+
+    if hasattr(result, '_fields'):  # NamedTuple, e.g. DashboardStats
+        return result._fields, [tuple(result)]
+    if not isinstance(result, list):  # A single value or a single row
+        result = [result if isinstance(result, tuple) else (result,)]
+    return columns, [row if isinstance(row, tuple) else (row,) for row in result]
+
+def write_rows(columns, rows, fmt, out):
+    if fmt == 'json':
+        json.dump([dict(zip(columns, row)) for row in rows], out, indent=2, default=str)
+        out.write('\n')
+    else:
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+def open_database(args):
+    db = ExpensesDB(args.db)
+    if args.backend == 'numpy':
+        from analytics import AnalyticsEngine
+        db = AnalyticsEngine(db)
+    return db
+
+def cmd_import(args, db, timings):
+    if args.mmap:  # One file at a time, each split across all the workers
+        results = {path: _timed(path, timings, process_large_csv, path, db, args.workers, args.batch_size,
+                                account=args.account)
+                   for path in find_csv_files(args.paths)}
+    elif len(args.paths) == 1 and not args.workers and args.paths[0].lower().endswith('.csv'):
+        results = {args.paths[0]: _timed('import', timings, process_csv, args.paths[0], db, args.batch_size,
+                                         account=args.account)}
+    else:
+        results = _timed('import', timings, process_files, args.paths, db, args.workers, args.batch_size,
+                         account=args.account)
+
+    write_rows(('file_path', 'records_added'), sorted(results.items()), args.format, sys.stdout)
+    return 0
+
+def cmd_watch(args, db, timings):
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(('file_path', 'records_added'))
+
+    def on_import(path, records_added):
+        writer.writerow((path, records_added))
+        sys.stdout.flush()
+
+    try:
+        watch_folder(args.folder, db, args.interval, batch_size=args.batch_size, progress=on_import,
+                     account=args.account)
+    except KeyboardInterrupt:  # Ctrl+C is the normal way out
+        pass
+    return 0
+
+def check_report_args(args):
+    """Turn a wrong number of report arguments into a usage error instead of a traceback."""
+    signature = inspect.signature(getattr(ExpensesDB, args.name))
+    try:
+        signature.bind(None, *args.args)  # None stands in for self
+    except TypeError as e:
+        params = ' '.join(name for name in list(signature.parameters)[1:])
+        args.usage_error(f"{args.name} takes [{params}]: {e}" if params else f"{args.name} takes no arguments")
+
+def cmd_report(args, db, timings):
+    result = _timed(args.name, timings, getattr(db, args.name), *[_parse_arg(a) for a in args.args])
+    columns, rows = _as_rows(args.name, result)
+    write_rows(columns, rows, args.format, sys.stdout)
+    return 0
+
+def cmd_clear(args, db, timings):
+    if not args.yes:
+        print("Refusing to clear the database without --yes", file=sys.stderr)
+        return 1
+    _timed('clear', timings, db.delete_database)
+    return 0
+
+def build_parser():
+    # Shared options live on every subcommand so they can go anywhere on the command line
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default='expenses.db',
+                        help="Database file name (inside the app data folder) or an absolute path")
+    common.add_argument('--backend', choices=('sqlite', 'numpy'), default='sqlite',
+                        help="Answer reports from SQLite or from the in-memory NumPy engine")
+    common.add_argument('--format', choices=('csv', 'json'), default='csv', help="Output format on stdout")
+    common.add_argument('--timings', action='store_true', help="Print how long each step took to stderr")
+
+    # Duplicate lines are only dropped within one account, so give each account's statements their own name
+    account = argparse.ArgumentParser(add_help=False)
+    account.add_argument('--account', default=DEFAULT_ACCOUNT,
+                         help="Account the statements belong to (default: the unnamed one)")
+
+    parser = argparse.ArgumentParser(prog='cli.py', description="Expense Analyzer 3000 without the GUI.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', parents=[common, account], help="Import CSV files and/or folders of CSV files")
+    import_parser.add_argument('paths', nargs='+')
+    import_parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: all cores)")
+    import_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    import_parser.add_argument('--mmap', action='store_true',
+                               help="Memory-map each file and parse it in parallel byte ranges (for very large files)")
+    import_parser.set_defaults(handler=cmd_import)
+
+    watch_parser = subparsers.add_parser('watch', parents=[common, account],
+                                         help="Keep importing new CSV files and lines appended to them (Ctrl+C to stop)")
+    watch_parser.add_argument('folder')
+    watch_parser.add_argument('--interval', type=float, default=WATCH_INTERVAL, help="Seconds between folder scans")
+    watch_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    watch_parser.set_defaults(handler=cmd_watch)
+
+    report_parser = subparsers.add_parser('report', parents=[common], help="Run a report and print its rows")
+    report_parser.add_argument('name', choices=sorted(REPORTS))
+    report_parser.add_argument('args', nargs='*', help="Arguments for the report, e.g. the year")
+    report_parser.set_defaults(handler=cmd_report, usage_error=report_parser.error)
+
+    clear_parser = subparsers.add_parser('clear', parents=[common], help="Delete every expense and the import history")
+    clear_parser.add_argument('--yes', action='store_true', help="Confirm the delete")
+    clear_parser.set_defaults(handler=cmd_clear)
+
+    return parser
+
+def main(argv=None):
+    timings = [('startup', time.perf_counter() - _STARTED)]
+    args = build_parser().parse_args(argv)
+    if args.command == 'report':
+        check_report_args(args)
+
+    db = _timed('open', timings, open_database, args)
+    try:
+        status = args.handler(args, db, timings)
+    finally:
+        db.close()
+
+    if args.timings:
+        for label, seconds in timings:
+            print(f"{label}: {seconds * 1000:.1f} ms", file=sys.stderr)
+
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,246 +1,893 @@
 import sqlite3
+from collections import OrderedDict
 from contextlib import contextmanager
+import functools
+import math
 import os
 import sys
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+# Default PRAGMAs applied to every connection. WAL lets the Summary/Queries pages keep reading
+# while an import is writing, and NORMAL sync is safe under WAL while avoiding an fsync per commit.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,          # Negative = KiB, so ~16 MB of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+SCHEMA_VERSION = 6  # Stored in PRAGMA user_version; bump it whenever _setup_schema changes
+
+DEBIT = 'Debit'
+CREDIT = 'Credit'
+TRIM_STDDEVS = 2.0  # Outlier cut-off for the trimmed averages on the Summary page
+
+# Lookup tables for the repeated strings; expenses only stores their integer ids
+LOOKUP_TABLES = ('price_categories', 'transaction_types', 'vendors')  # Same order as the expense row columns
+
+# Account (or other statement source) rows are imported under. Fingerprints only dedupe within one
+# account, so identical lines on two accounts' statements are both kept; this is the one used when none is given.
+DEFAULT_ACCOUNT = ''
+
+# Covering indexes for the report queries that still read expenses (the month, year and category
+# reports read monthly_rollup). Every report filters on type_id by equality, so it leads each index
+# and the remaining columns match the GROUP BY / ORDER BY of the reports.
+INDEXES = {
+    'idx_expenses_type_vendor': 'expenses(type_id, vendor_id, cost_cents)',
+    'idx_expenses_type_cost': 'expenses(type_id, cost_cents)',
+}
+
+# Rows whose fingerprint is already stored for their account (the same statement line imported before) are skipped
+INSERT_EXPENSE = '''
+    INSERT OR IGNORE INTO expenses(year_month, cost_cents, category_id, type_id, vendor_id, fingerprint, account_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Optional file_imports columns describing what an import read (see add_expenses_bulk's file_info)
+FILE_INFO_COLUMNS = {
+    'content_hash': 'TEXT',   # blake2b of the bytes this import read
+    'file_size': 'INTEGER',   # How many bytes that was
+    'byte_offset': 'INTEGER', # Where reading stopped, so an appended-to file can carry on from there
+    'day_offset': 'INTEGER',  # Start of the last date's lines, where a follow-up import picks up
+    'tail_hash': 'TEXT',      # blake2b of the bytes from day_offset to byte_offset, to check they're unchanged
+}
+
+# file_imports columns added after the first version, with the ones above
+IMPORT_COLUMNS = {
+    'account': 'TEXT',                # Account the rows were imported under
+    'duplicates_skipped': 'INTEGER',  # Lines left out because their account already had them
+    **FILE_INFO_COLUMNS,
+}
+
+INSERT_FILE_IMPORT = f'''
+    INSERT INTO file_imports (file_path, records_added, {', '.join(IMPORT_COLUMNS)})
+    VALUES (?, ?{', ?' * len(IMPORT_COLUMNS)})
+'''
+
+TYPE_ID = '(SELECT id FROM transaction_types WHERE name = ?)'  # Resolves a type name to its id inside a query
+ACCOUNT_ID = '(SELECT id FROM accounts WHERE name = ?)'
+
+class DashboardStats(NamedTuple):
+    """Everything the Summary page shows, gathered by ExpensesDB.dashboard_stats()."""
+    total_spent: Optional[float]
+    total_received: Optional[float]
+    total_transactions: int
+    avg_debit: Optional[float]                       # Outlier-trimmed averages
+    avg_credit: Optional[float]
+    debits_per_month: Optional[float]
+    credits_per_month: Optional[float]
+    biggest_purchase: Optional[Tuple[float, str]]    # (cost, vendor)
+    most_visited: Optional[Tuple[str, int]]          # (vendor, visits)
+    highest_avg_vendor: Optional[Tuple[str, float]]  # (vendor, average cost)
+
+ROLLUP_INSERT = '''
+    INSERT INTO monthly_rollup(year_month, transaction_type, price_category,
+                               total_cents, count, sum_squares, min_cents, max_cents)
+'''
+
+ROLLUP_MERGE = '''
+    ON CONFLICT(year_month, transaction_type, price_category) DO UPDATE SET
+        total_cents = total_cents + excluded.total_cents,
+        count = count + excluded.count,
+        sum_squares = sum_squares + excluded.sum_squares,
+        min_cents = MIN(min_cents, excluded.min_cents),
+        max_cents = MAX(max_cents, excluded.max_cents)
+'''
+
+UPSERT_ROLLUP = ROLLUP_INSERT + 'VALUES (?, ?, ?, ?, ?, ?, ?, ?)' + ROLLUP_MERGE
+
+# Folds every expense with id > ? into the rollup, grouped the same way as its key
+ROLLUP_SINCE = ROLLUP_INSERT + '''
+    SELECT e.year_month, t.name, c.name,
+           SUM(e.cost_cents), COUNT(*), SUM(CAST(e.cost_cents AS REAL) * e.cost_cents),
+           MIN(e.cost_cents), MAX(e.cost_cents)
+    FROM expenses e
+    JOIN transaction_types t ON t.id = e.type_id
+    JOIN price_categories c ON c.id = e.category_id
+    WHERE e.id > ?
+    GROUP BY e.year_month, e.type_id, e.category_id
+''' + ROLLUP_MERGE
+
+def to_cents(cost):
+    return None if cost is None else round(cost * 100)
+
+def rollup_rows(rows, totals=None):
+    """Fold (year_month, cost, price_cat, transaction_type, vendor) rows into per-month rollup totals.
+
+    Returns {(year_month, transaction_type, price_category): [total, count, sum_squares, min, max]},
+    all in cents (sum_squares is a float, cents squared overflow integers on big imports).
+    Pass an existing dict as totals to keep accumulating across batches.
+    """
+    if totals is None:
+        totals = {}
+
+    for year_month, cost, price_cat, transaction_type, *_ in rows:
+        cost = round(cost * 100)
+        key = (year_month, transaction_type, price_cat)
+        stats = totals.get(key)
+        if stats is None:
+            totals[key] = [cost, 1, float(cost) * cost, cost, cost]
+        else:
+            stats[0] += cost
+            stats[1] += 1
+            stats[2] += float(cost) * cost
+            if cost < stats[3]:
+                stats[3] = cost
+            if cost > stats[4]:
+                stats[4] = cost
+
+    return totals
+
+def cached_query(method):
+    """Serve repeat calls from ExpensesDB's result cache until the data generation changes.
+
+    Cached results are shared between callers, so treat them as read-only.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._cached_call(method, args, kwargs)
+    wrapper.cached_query = True  # Lets wrappers such as async_api tell the read-only reports apart
+    return wrapper
 
 class ExpensesDB:
-    def __init__(self, db_name='expenses.db'):
+    def __init__(self, db_name='expenses.db', cache_size=128, **pragmas):
         app_data = os.environ.get('APPDATA', os.path.expanduser('~'))
         base_dir = os.path.join(app_data, 'ExpenseAnalyzer3000')
         os.makedirs(base_dir, exist_ok=True)
         self.db_name = os.path.join(base_dir, db_name)
-        self.init_db()
+
+        unknown = set(pragmas) - set(DEFAULT_PRAGMAS)
+        if unknown:
+            raise ValueError(f"Unsupported PRAGMA(s): {', '.join(sorted(unknown))}")
+        self.pragmas = {**DEFAULT_PRAGMAS, **pragmas}
+
+        # One long-lived writer shared behind a lock, plus one long-lived reader per thread
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._connection_hooks = []
+
+        # Report results keyed by (method, args), each tagged with the data generation it was read at
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Nothing touches the database file until the first query, so creating ExpensesDB is free
+        self._schema_ready = False
+
+        # name -> id for each lookup table, valid only while nobody else has written (see _lookup_ids)
+        self._lookups = None
+        self._lookups_generation = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            if value is not None:
+                conn.execute(f'PRAGMA {name} = {value}')
+        for hook in self._connection_hooks:
+            hook(conn)
+        return conn
+
+    def add_connection_hook(self, hook):
+        """Call hook(conn) on every open connection now and on each one opened later (e.g. to trace SQL)."""
+        self._connection_hooks.append(hook)
+        with self._write_lock:
+            if self._writer is not None:
+                hook(self._writer)
+        with self._readers_lock:
+            for conn in self._readers:
+                hook(conn)
 
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_name)
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Yield this thread's read connection, opening it on first use."""
+        if not self._schema_ready:
+            self.init_db()
 
-    def init_db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        yield conn
+
+    @contextmanager
+    def get_write_connection(self):
+        """Yield the single writer connection. Commits on success and rolls back on any error."""
+        with self._write_lock:
+            if self._writer is None:
+                self._open_writer()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def _cached_call(self, method, args, kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        generation = self.data_generation()
+
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == generation:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return entry[1]
+            self.cache_misses += 1
+
+        result = method(self, *args, **kwargs)
+
+        with self._cache_lock:
+            self._cache[key] = (generation, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)  # Evict the least recently used result
+
+        return result
+
+    def cache_stats(self):
+        with self._cache_lock:
+            return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                    'size': len(self._cache), 'max_size': self.cache_size}
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def data_generation(self):
+        """Counter bumped by every write. It lives in the database so other processes' imports are seen too."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS expenses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    year_month TEXT NOT NULL,
-                    cost REAL,
-                    price_category TEXT,
-                    transaction_type TEXT,
-                    vendor TEXT
+            cursor.execute("SELECT value FROM db_state WHERE name = 'generation'")
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _bump_generation(cursor):
+        cursor.execute("UPDATE db_state SET value = value + 1 WHERE name = 'generation'")
+
+    def close(self):
+        """Close the writer and every reader connection. Safe to call more than once."""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.execute('PRAGMA optimize')  # Refresh planner stats for the new indexes
+                self._writer.close()
+                self._writer = None
+
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self._local = threading.local()
+
+    def _open_writer(self):
+        conn = self._connect()
+        if not self._schema_ready:
+            try:
+                migrated = self._setup_schema(conn.cursor())
+                conn.commit()
+                if migrated:
+                    conn.execute('VACUUM')  # Hand the space the old layout used back to the file system
+            except BaseException:
+                conn.close()
+                raise
+            self._schema_ready = True
+        self._writer = conn
+
+    def init_db(self):
+        """Make sure the schema exists. Runs on first use, so callers normally never need it."""
+        with self.get_write_connection():
+            pass
+
+    def _setup_schema(self, cursor):
+        """Create or upgrade the schema. Returns True when an old layout was migrated."""
+        # A matching user_version means this file is already fully set up, skip all the DDL
+        cursor.execute('PRAGMA user_version')
+        if cursor.fetchone()[0] == SCHEMA_VERSION:
+            return False
+
+        for table in LOOKUP_TABLES + ('accounts',):
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
                 )
             ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS file_imports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    file_path TEXT NOT NULL,
-                    records_added INTEGER NOT NULL,
-                    imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
+
+        cursor.execute('INSERT OR IGNORE INTO accounts (name) VALUES (?)', (DEFAULT_ACCOUNT,))
+
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(expenses)')}
+        if 'cost' in columns:  # Older databases store cost as REAL and the strings on every row
+            self._migrate_expenses(cursor)
+        elif columns and 'account_id' not in columns:
+            # Versions 2-5 put every row in the default account. Versions 2-4 also kept a year column
+            # and indexes no report reads any more, and version 2 predates row fingerprints; those
+            # rows just stay NULL (never duplicates)
+            fingerprint = 'fingerprint' if 'fingerprint' in columns else 'NULL'
+            self._replace_expenses(cursor, f'''
+                SELECT id, year_month, cost_cents, category_id, type_id, vendor_id, {fingerprint}, {ACCOUNT_ID}
+                FROM expenses
+                ORDER BY id
+            ''', (DEFAULT_ACCOUNT,))
+        else:
+            self._create_expenses(cursor, 'expenses')
+        migrated = bool(columns) and 'account_id' not in columns
+
+        for name, target in INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_fingerprint ON expenses(account_id, fingerprint)')
+
+        # The old rows with names and dollar cost (plus the raw cents), for anything that wants whole expense rows
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS expense_rows AS
+            SELECT e.id, e.year_month, e.cost_cents / 100.0 AS cost, c.name AS price_category,
+                   t.name AS transaction_type, v.name AS vendor, e.cost_cents
+            FROM expenses e
+            LEFT JOIN price_categories c ON c.id = e.category_id
+            LEFT JOIN transaction_types t ON t.id = e.type_id
+            LEFT JOIN vendors v ON v.id = e.vendor_id
+        ''')
+
+        # Pre-aggregated per-month totals so the charts and totals don't re-scan every expense
+        if 'cost' in columns:
+            cursor.execute('DROP TABLE IF EXISTS monthly_rollup')  # Held REAL dollars
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'monthly_rollup'")
+        rollup_exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS monthly_rollup (
+                year_month TEXT NOT NULL,
+                transaction_type TEXT NOT NULL,
+                price_category TEXT NOT NULL,
+                total_cents INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                sum_squares REAL NOT NULL,
+                min_cents INTEGER,
+                max_cents INTEGER,
+                PRIMARY KEY (year_month, transaction_type, price_category)
+            ) WITHOUT ROWID
+        ''')
+        if not rollup_exists:
+            self.rebuild_rollup(cursor)
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS db_state (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO db_state (name, value) VALUES ('generation', 0)")
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_imports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_path TEXT NOT NULL,
+                records_added INTEGER NOT NULL,
+                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(file_imports)')}
+        for column, column_type in IMPORT_COLUMNS.items():
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE file_imports ADD COLUMN {column} {column_type}')
+        if 'account' not in columns:  # Everything before accounts went into the default one
+            cursor.execute('UPDATE file_imports SET account = ?', (DEFAULT_ACCOUNT,))
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_imports_size ON file_imports(file_size, content_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_imports_path ON file_imports(file_path, id)')
+
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        return migrated
+
+    @staticmethod
+    def _create_expenses(cursor, name):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                year_month TEXT NOT NULL,
+                cost_cents INTEGER,
+                category_id INTEGER REFERENCES price_categories(id),
+                type_id INTEGER REFERENCES transaction_types(id),
+                vendor_id INTEGER REFERENCES vendors(id),
+                fingerprint INTEGER,
+                account_id INTEGER REFERENCES accounts(id)
+            )
+        ''')
+
+    def _migrate_expenses(self, cursor):
+        """Copy an old-layout expenses table (REAL cost, TEXT names) into the compact one, keeping ids."""
+        for table, column in zip(LOOKUP_TABLES, ('price_category', 'transaction_type', 'vendor')):
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO {table} (name)
+                SELECT DISTINCT {column} FROM expenses WHERE {column} IS NOT NULL
             ''')
-            conn.commit()
+
+        self._replace_expenses(cursor, f'''
+            SELECT e.id, e.year_month, CAST(ROUND(e.cost * 100) AS INTEGER), c.id, t.id, v.id, NULL, {ACCOUNT_ID}
+            FROM expenses e
+            LEFT JOIN price_categories c ON c.name = e.price_category
+            LEFT JOIN transaction_types t ON t.name = e.transaction_type
+            LEFT JOIN vendors v ON v.name = e.vendor
+            ORDER BY e.id
+        ''', (DEFAULT_ACCOUNT,))
+
+    def _replace_expenses(self, cursor, select, params=()):
+        """Swap expenses for a table in the current layout filled from select (one row per column, ids kept)."""
+        self._create_expenses(cursor, 'expenses_compact')
+        cursor.execute(f'''
+            INSERT INTO expenses_compact (id, year_month, cost_cents, category_id, type_id, vendor_id, fingerprint,
+                                          account_id)
+            {select}
+        ''', params)
+
+        # Keep the AUTOINCREMENT high-water mark so ids of deleted rows are still never reused
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'expenses'")
+        sequence = cursor.fetchone()
+
+        cursor.execute('DROP VIEW IF EXISTS expense_rows')  # Recreated by _setup_schema; it would block the rename
+        cursor.execute('DROP TABLE expenses')  # Takes the old indexes with it
+        cursor.execute('ALTER TABLE expenses_compact RENAME TO expenses')
+        if sequence is not None:
+            cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'expenses'", sequence)
+
+    def _lookup_ids(self, cursor):
+        """name -> id dicts for the lookup tables, for a write that is about to bump the generation.
+
+        Ids are only cached while the generation is the one our own last write left behind, so a
+        rolled back write or another process's import/clear just means reloading them.
+        """
+        cursor.execute("SELECT value FROM db_state WHERE name = 'generation'")
+        generation = cursor.fetchone()[0]
+        if self._lookups is None or generation != self._lookups_generation:
+            self._lookups = {}
+            for table in LOOKUP_TABLES:
+                cursor.execute(f'SELECT name, id FROM {table}')
+                self._lookups[table] = dict(cursor.fetchall())
+                self._lookups[table][None] = None
+        self._lookups_generation = generation + 1
+        return self._lookups
+
+    @staticmethod
+    def _account_id(cursor, account):
+        cursor.execute('INSERT OR IGNORE INTO accounts (name) VALUES (?)', (account,))
+        cursor.execute(f'SELECT {ACCOUNT_ID}', (account,))
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _encode(cursor, lookups, rows, account_id):
+        """(year_month, cost, price_cat, transaction_type, vendor[, fingerprint]) rows -> INSERT_EXPENSE parameters."""
+        ids = [lookups[table] for table in LOOKUP_TABLES]
+        for table, table_ids, position in zip(LOOKUP_TABLES, ids, (2, 3, 4)):
+            for name in {row[position] for row in rows} - table_ids.keys():
+                cursor.execute(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', (name,))
+                cursor.execute(f'SELECT id FROM {table} WHERE name = ?', (name,))
+                table_ids[name] = cursor.fetchone()[0]
+
+        category_ids, type_ids, vendor_ids = ids
+        return [(year_month, to_cents(cost), category_ids[price_cat], type_ids[transaction_type], vendor_ids[vendor],
+                 fingerprint[0] if fingerprint else None, account_id)
+                for year_month, cost, price_cat, transaction_type, vendor, *fingerprint in rows]
 
     def log_import(self, file_path, records_added):
-        with self.get_connection() as conn:
+        with self.get_write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO file_imports (file_path, records_added)
                 VALUES (?, ?)
             ''', (file_path, records_added))
-            conn.commit()
+            self._bump_generation(cursor)
+
+    def add_expenses_bulk(self, batches, file_path=None, file_info=None, account=DEFAULT_ACCOUNT):
+        """Insert batches of (year_month, cost, price_cat, transaction_type, vendor[, fingerprint]) rows into account.
+
+        Rows with a fingerprint that account already has are skipped, so re-importing overlapping
+        statements only adds the new lines; the return value counts the rows actually added, and
+        the file_imports row records how many were skipped.
+        Everything runs on one connection inside one transaction, so either every batch (and the
+        file_imports row, when a file_path is given) is committed or nothing is. file_info, when
+        given, is called once every batch is consumed and returns a dict of FILE_INFO_COLUMNS values
+        for that row.
+        """
+        records_added = 0
+        records_read = 0
 
+        with self.get_write_connection() as conn:
+            cursor = conn.cursor()
+            lookups = self._lookup_ids(cursor)
+            account_id = self._account_id(cursor, account)
+            cursor.execute('''SELECT COALESCE(MAX(id), 0) FROM expenses''')
+            last_id = cursor.fetchone()[0]
+
+            for batch in batches:
+                cursor.executemany(INSERT_EXPENSE, self._encode(cursor, lookups, batch, account_id))
+                records_read += len(batch)
+                records_added += cursor.rowcount  # Ignored duplicates don't count
+
+            # Only rows that were really inserted land past last_id (AUTOINCREMENT), so the rollup
+            # is folded from those, in the same transaction so it can never drift from expenses
+            self._rollup_since(cursor, last_id)
+
+            if file_path is not None:
+                info = file_info() if file_info is not None else {}
+                cursor.execute(INSERT_FILE_IMPORT, [file_path, records_added, account, records_read - records_added]
+                               + [info.get(column) for column in FILE_INFO_COLUMNS])
+
+            self._bump_generation(cursor)
+
+        return records_added
+
+    def last_import(self, file_path, account=DEFAULT_ACCOUNT):
+        """(byte_offset, day_offset, tail_hash) recorded by the latest import of file_path into account, or None."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT byte_offset, day_offset, tail_hash
+                FROM file_imports
+                WHERE file_path = ? AND account = ?
+                ORDER BY id DESC
+                LIMIT 1
+            ''', (file_path, account))
+            return cursor.fetchone()
+
+    def find_import(self, file_size, content_hash=None, account=DEFAULT_ACCOUNT):
+        """(file_path, imported_at) of earlier imports into account of this file size (and content hash, when given)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT file_path, imported_at
+                FROM file_imports
+                WHERE file_size = ? AND (?2 IS NULL OR content_hash = ?2) AND account = ?3
+            ''', (file_size, content_hash, account))
+            return cursor.fetchall()
+
+    @cached_query
     def get_imported_files(self):
+        """(file_path, records_added, imported_at, duplicates_skipped, account) for every import, newest first."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT file_path, records_added, imported_at
+                SELECT file_path, records_added, imported_at, duplicates_skipped, account
                 FROM file_imports
                 ORDER BY imported_at DESC
             ''')
             return cursor.fetchall()
 
     def add_expense(self, year_month, cost, price_cat, transaction_type, vendor=""):
-        with self.get_connection() as conn:
+        with self.get_write_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO expenses(year_month, cost, price_category, transaction_type, vendor)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (year_month, cost, price_cat, transaction_type, vendor)
-            )
-            conn.commit()
-            return cursor.lastrowid
+            row = (year_month, cost, price_cat, transaction_type, vendor)
+            account_id = self._account_id(cursor, DEFAULT_ACCOUNT)
+            cursor.execute(INSERT_EXPENSE, self._encode(cursor, self._lookup_ids(cursor), [row], account_id)[0])
+            expense_id = cursor.lastrowid
+
+            totals = rollup_rows([row])
+            cursor.executemany(UPSERT_ROLLUP, [key + tuple(stats) for key, stats in totals.items()])
+            self._bump_generation(cursor)
+            return expense_id
+
+    def rebuild_rollup(self, cursor=None):
+        """Recompute monthly_rollup from scratch out of the expenses table."""
+        if cursor is None:
+            with self.get_write_connection() as conn:
+                return self.rebuild_rollup(conn.cursor())
+
+        cursor.execute('''DELETE FROM monthly_rollup''')
+        self._rollup_since(cursor, 0)
 
+    @staticmethod
+    def _rollup_since(cursor, last_id):
+        """Add every expense with id > last_id to monthly_rollup."""
+        cursor.execute(ROLLUP_SINCE, (last_id,))
+
+    @cached_query
     def get_available_years(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT DISTINCT year_month
-                FROM expenses
+                SELECT DISTINCT CAST(SUBSTR(year_month, 1, 4) AS INTEGER) AS year
+                FROM monthly_rollup
+                ORDER BY year DESC
             ''')
+            return [row[0] for row in cursor.fetchall()]
 
-            years = set()  # Parse for the years here rather than in the GUI
-            for row in cursor.fetchall():
-                year_month = row[0]
-                year = int(year_month[:4])  # Get first 4 characters
-                years.add(year)
-
-            return sorted(years, reverse=True)
-
+    @cached_query
     def monthly_debit_credit_given_year(self, year):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                    SELECT 
+                    SELECT
                         SUBSTR(year_month, -2, 2) as month,
                         transaction_type,
-                        SUM(cost) as total
-                    FROM expenses
-                    WHERE SUBSTR(year_month, 1, 4) = ?
+                        SUM(total_cents) / 100.0 as total
+                    FROM monthly_rollup
+                    WHERE year_month >= ? AND year_month < ?
                     GROUP BY month, transaction_type
                     ORDER BY month
-                ''', (str(year),))
+                ''', (f"{int(year)}-", f"{int(year) + 1}-"))  # Key range on the rollup's primary key
             return cursor.fetchall()
 
     def all_expenses(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                     SELECT *
-                     FROM expenses
+                     SELECT id, year_month, cost, price_category, transaction_type, vendor
+                     FROM expense_rows
                  ''')
             return cursor.fetchall()
 
-    def largest_10_purchases(self):
+    def expenses_page(self, after_id=0, limit=200):
+        """Keyset pagination over expenses: the next `limit` rows with id > after_id, in id order."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT * 
-                FROM expenses
-                WHERE transaction_type NOT LIKE ?
-                ORDER BY cost DESC
+                SELECT id, year_month, cost, price_category, transaction_type, vendor
+                FROM expense_rows
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (after_id, limit))
+            return cursor.fetchall()
+
+    @cached_query
+    def expense_count(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''SELECT COALESCE(SUM(count), 0) FROM monthly_rollup''')
+            return cursor.fetchone()[0]
+
+    @cached_query
+    def largest_10_purchases(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT e.id, e.year_month, e.cost_cents / 100.0, c.name, t.name, v.name
+                FROM expenses e
+                LEFT JOIN price_categories c ON c.id = e.category_id
+                LEFT JOIN transaction_types t ON t.id = e.type_id
+                LEFT JOIN vendors v ON v.id = e.vendor_id
+                WHERE e.type_id = {TYPE_ID}
+                ORDER BY e.cost_cents DESC
                 LIMIT 10
-            ''', ('%Credit%',))
+            ''', (DEBIT,))
             return cursor.fetchall()
 
+    @cached_query
     def total_debits_credits(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT transaction_type, SUM(cost) 
-                FROM expenses
+                SELECT transaction_type, SUM(total_cents) / 100.0
+                FROM monthly_rollup
                 GROUP BY transaction_type
-                ORDER BY SUM(cost) DESC
+                ORDER BY SUM(total_cents) DESC
             ''')
             return cursor.fetchall()
 
+    @cached_query
     def total_purchase_categories(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT price_category, SUM(cost), COUNT(*)
-                FROM expenses
-                WHERE transaction_type NOT LIKE ?
+                SELECT price_category, SUM(total_cents) / 100.0, SUM(count)
+                FROM monthly_rollup
+                WHERE transaction_type = ?
                 GROUP BY price_category
-                ORDER BY SUM(Cost) DESC
-            ''', ('%Credit%',))
+                ORDER BY SUM(total_cents) DESC
+            ''', (DEBIT,))
             return cursor.fetchall()
 
+    @cached_query
     def total_purchase_vendor(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                  SELECT vendor, SUM(cost), COUNT(*)
-                  FROM expenses
-                  WHERE transaction_type NOT LIKE ?
-                  GROUP BY vendor
-                  ORDER BY COUNT(*) DESC
-              ''', ('%Credit%',))
+            # Group on the vendor id using the covering index, then look up just one name per vendor
+            cursor.execute(f'''
+                  SELECT v.name, s.total / 100.0, s.visits
+                  FROM (
+                      SELECT vendor_id, SUM(cost_cents) AS total, COUNT(*) AS visits
+                      FROM expenses
+                      WHERE type_id = {TYPE_ID}
+                      GROUP BY vendor_id
+                  ) s
+                  LEFT JOIN vendors v ON v.id = s.vendor_id
+                  ORDER BY s.visits DESC, v.name
+              ''', (DEBIT,))
             return cursor.fetchall()
 
+    @cached_query
     def total_year_over_year(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT 
-                    SUBSTR(year_month, 1, 4) AS year, 
-                    SUM(cost), 
-                    COUNT(*)
-                FROM expenses
-                WHERE transaction_type NOT LIKE ?
-                GROUP BY year
-                ORDER BY year DESC
-              ''', ('%Credit%',))
+                SELECT
+                    SUBSTR(year_month, 1, 4) AS year_label,
+                    SUM(total_cents) / 100.0,
+                    SUM(count)
+                FROM monthly_rollup
+                WHERE transaction_type = ?
+                GROUP BY year_label
+                ORDER BY year_label DESC
+              ''', (DEBIT,))
             return cursor.fetchall()
 
+    @cached_query
     def average_spending_by_vendor(self, min_transactions=5):
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT vendor, AVG(cost), COUNT(*), SUM(cost)
-                FROM expenses
-                WHERE transaction_type NOT LIKE ?
-                GROUP BY vendor
-                HAVING COUNT(*) >= ?
-                ORDER BY AVG(cost) DESC
-            ''', ('%Credit%', min_transactions))
+            cursor.execute(f'''
+                SELECT v.name, s.total / 100.0 / s.visits, s.visits, s.total / 100.0
+                FROM (
+                    SELECT vendor_id, SUM(cost_cents) AS total, COUNT(*) AS visits
+                    FROM expenses
+                    WHERE type_id = {TYPE_ID}
+                    GROUP BY vendor_id
+                    HAVING COUNT(*) >= ?
+                ) s
+                LEFT JOIN vendors v ON v.id = s.vendor_id
+                ORDER BY s.total * 1.0 / s.visits DESC, v.name
+            ''', (DEBIT, min_transactions))
             return cursor.fetchall()
 
     def delete_database(self):
-        with self.get_connection() as conn:
+        with self.get_write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''DELETE FROM expenses''')
             cursor.execute('''DELETE FROM file_imports''')
-            conn.commit()
+            for table in LOOKUP_TABLES:
+                cursor.execute(f'DELETE FROM {table}')
+            self.rebuild_rollup(cursor)
+            self._bump_generation(cursor)
 
 #  -------------- Summary --------------
-    def average_debit_credit_overall(self):
+    @cached_query
+    def average_debit_credit_overall(self, stddevs=TRIM_STDDEVS):
+        """Average debit/credit with anything more than `stddevs` standard deviations from the mean left out.
+
+        The mean and (population) standard deviation per type come from the rollup's count, sum and
+        sum of squares, so only one filtered range scan of the (transaction_type, cost) index is left.
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                WITH SpendingStats AS (
-                    SELECT
-                        transaction_type,
-                        cost,
-                        AVG(cost) OVER(PARTITION BY transaction_type) AS spend_avg,
-                        SQRT(
-                            AVG(cost * cost) OVER(PARTITION BY transaction_type) -
-                            AVG(cost) OVER(PARTITION BY transaction_type) *
-                            AVG(cost) OVER(PARTITION BY transaction_type)
-                        ) AS spend_stddev
-                    FROM expenses
-                )
-                SELECT transaction_type, AVG(cost) AS cleaned_avg
-                FROM SpendingStats
-                WHERE cost BETWEEN (spend_avg - (2 * spend_stddev)) AND (spend_avg + (2 * spend_stddev)) 
+                SELECT transaction_type, SUM(total_cents), SUM(count), SUM(sum_squares)
+                FROM monthly_rollup
                 GROUP BY transaction_type
-                HAVING COUNT(*) > 1
+                ORDER BY transaction_type
             ''')
-            return cursor.fetchall()
+            type_stats = cursor.fetchall()
+
+            results = []
+            for transaction_type, total, count, sum_squares in type_stats:
+                mean = total / count
+                spread = stddevs * math.sqrt(max(sum_squares / count - mean * mean, 0.0))  # Clamp float noise
 
+                cursor.execute(f'''
+                    SELECT AVG(cost_cents) / 100.0, COUNT(*)
+                    FROM expenses
+                    WHERE type_id = {TYPE_ID} AND cost_cents BETWEEN ? AND ?
+                ''', (transaction_type, mean - spread, mean + spread))
+                cleaned_avg, kept = cursor.fetchone()
+
+                if kept > 1:
+                    results.append((transaction_type, cleaned_avg))
+
+            return results
+
+    @cached_query
     def summary_totals(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT
-                    SUM(CASE WHEN transaction_type NOT LIKE '%Credit%' THEN cost ELSE 0 END) AS total_spent,
-                    SUM(CASE WHEN transaction_type LIKE '%Credit%' THEN cost ELSE 0 END) AS total_received,
-                    COUNT(*) AS total_transactions
-                FROM expenses
-            ''')
+                    SUM(CASE WHEN transaction_type = ? THEN total_cents ELSE 0 END) / 100.0 AS total_spent,
+                    SUM(CASE WHEN transaction_type = ? THEN total_cents ELSE 0 END) / 100.0 AS total_received,
+                    COALESCE(SUM(count), 0) AS total_transactions
+                FROM monthly_rollup
+            ''', (DEBIT, CREDIT))
             return cursor.fetchone()
 
+    @cached_query
     def avg_transactions_per_month(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT transaction_type, AVG(monthly_count) AS avg_per_month
                 FROM (
-                    SELECT year_month, transaction_type, COUNT(*) AS monthly_count
-                    FROM expenses
+                    SELECT year_month, transaction_type, SUM(count) AS monthly_count
+                    FROM monthly_rollup
                     GROUP BY year_month, transaction_type
                 )
                 GROUP BY transaction_type
             ''')
             return cursor.fetchall()
+
+    @cached_query
+    def dashboard_stats(self, min_transactions=5):
+        """All Summary page numbers in a handful of index/rollup reads instead of one full scan per card."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Totals and per-month counts both come out of the rollup in one pass
+            cursor.execute('''
+                SELECT transaction_type, SUM(total_cents) / 100.0, SUM(count), COUNT(DISTINCT year_month)
+                FROM monthly_rollup
+                GROUP BY transaction_type
+            ''')
+            by_type = {row[0]: row[1:] for row in cursor.fetchall()}
+            debit = by_type.get(DEBIT, (None, 0, 0))
+            credit = by_type.get(CREDIT, (None, 0, 0))
+
+            cursor.execute(f'''
+                SELECT e.cost_cents / 100.0, v.name
+                FROM expenses e
+                LEFT JOIN vendors v ON v.id = e.vendor_id
+                WHERE e.type_id = {TYPE_ID}
+                ORDER BY e.cost_cents DESC
+                LIMIT 1
+            ''', (DEBIT,))
+            biggest = cursor.fetchone()
+
+            # One grouped walk of the vendor index feeds both vendor highlights
+            cursor.execute(f'''
+                WITH vendor_stats AS (
+                    SELECT v.name AS vendor, s.visits, s.total / 100.0 / s.visits AS avg_cost
+                    FROM (
+                        SELECT vendor_id, SUM(cost_cents) AS total, COUNT(*) AS visits
+                        FROM expenses
+                        WHERE type_id = {TYPE_ID}
+                        GROUP BY vendor_id
+                    ) s
+                    LEFT JOIN vendors v ON v.id = s.vendor_id
+                )
+                SELECT * FROM (SELECT 'visits', vendor, visits FROM vendor_stats ORDER BY visits DESC, vendor LIMIT 1)
+                UNION ALL
+                SELECT * FROM (SELECT 'avg', vendor, avg_cost FROM vendor_stats
+                               WHERE visits >= ? ORDER BY avg_cost DESC, vendor LIMIT 1)
+            ''', (DEBIT, min_transactions))
+            vendors = {kind: (vendor, value) for kind, vendor, value in cursor.fetchall()}
+
+        trimmed = dict(self.average_debit_credit_overall())
+
+        return DashboardStats(
+            total_spent=debit[0],
+            total_received=credit[0],
+            total_transactions=sum(row[1] for row in by_type.values()),
+            avg_debit=trimmed.get(DEBIT),
+            avg_credit=trimmed.get(CREDIT),
+            debits_per_month=debit[1] / debit[2] if debit[2] else None,
+            credits_per_month=credit[1] / credit[2] if credit[2] else None,
+            biggest_purchase=tuple(biggest) if biggest else None,
+            most_visited=vendors.get('visits'),
+            highest_avg_vendor=vendors.get('avg'),
+        )
@@ -0,0 +1,136 @@
+"""Bank statement layouts: which column holds what, how dates are written and which way amounts are signed.
+
+A file's format and field delimiter are detected from its first few KiB, then the rows are read with the
+csv module's C reader, so quoted descriptions with commas in them parse correctly. To support another
+bank, describe its export with a BankFormat and register_format() it:
+
+    register_format(BankFormat('mybank', date='Posted', description='Payee', amount='Amount',
+                               date_format='%m/%d/%Y', has_header=True))
+
+Columns are 0-based indexes, or header names (matched case-insensitively) for files with a header row.
+Give either separate debit/credit columns or one signed amount column; debit_sign says whether money
+going out is negative (-1, the usual) or positive (1) in that column.
+"""
+import csv
+from collections import namedtuple
+from datetime import datetime
+
+SNIFF_BYTES = 16 * 1024  # How much of the start of a file format detection looks at
+SNIFF_ROWS = 20
+DELIMITERS = ',;\t|'
+ISO_DATE = '%Y-%m-%d'
+
+class BankFormat(namedtuple('BankFormat', ['name', 'date', 'description', 'debit', 'credit', 'amount', 'date_format',
+                                           'debit_sign', 'has_header'],
+                            defaults=[None, None, None, ISO_DATE, -1, False])):
+    """One bank's CSV layout, see the module docstring."""
+
+    def bind(self, header):
+        """This format with header names swapped for the column indexes they have in header."""
+        if not self.has_header:
+            return self
+        names = [cell.strip().lower() for cell in header]
+        columns = {field: getattr(self, field) for field in ('date', 'description', 'debit', 'credit', 'amount')
+                   if isinstance(getattr(self, field), str)}
+        missing = [name for name in columns.values() if name.lower() not in names]
+        if missing:
+            raise ValueError(f"{self.name} file is missing column(s): {', '.join(missing)}")
+        return self._replace(**{field: names.index(name.lower()) for field, name in columns.items()})
+
+    def matches(self, rows):
+        """Whether the first rows of a file (already split into cells) look like this format."""
+        rows = [row for row in rows if any(cell.strip() for cell in row)]
+        if not rows:
+            return False
+        if self.has_header:
+            names = {cell.strip().lower() for cell in rows[0]}
+            return all(column.lower() in names for column in (self.date, self.description, self.debit, self.credit,
+                                                              self.amount) if column is not None)
+        try:
+            return self.is_date(rows[0][self.date])
+        except IndexError:
+            return False
+
+    def is_date(self, text):
+        """Whether text is a date written the way this bank writes them."""
+        try:
+            if self.date_format == ISO_DATE:  # The common case, which has a much quicker parser
+                datetime.fromisoformat(text.strip())
+            else:
+                datetime.strptime(text.strip(), self.date_format)
+        except ValueError:
+            return False
+        return True
+
+    def year_month(self, date):
+        """'YYYY-MM' for a date as the bank writes it."""
+        if self.date_format == ISO_DATE:  # The common case, sliced rather than parsed
+            return '-'.join(date.split('-')[:2])
+        return datetime.strptime(date.strip(), self.date_format).strftime('%Y-%m')
+
+    def cost(self, row):
+        """(cost, "Debit" or "Credit") for a row, or None when it has no amount."""
+        if self.amount is None:
+            debit = row[self.debit] if len(row) > self.debit else None
+            if debit:
+                return float(debit), "Debit"
+            credit = row[self.credit] if len(row) > self.credit else None
+            if credit:
+                return float(credit), "Credit"
+            return None
+
+        value = row[self.amount].strip() if len(row) > self.amount else None
+        if not value:
+            return None
+        cost = float(value)
+        return abs(cost), "Debit" if (cost < 0) == (self.debit_sign < 0) else "Credit"
+
+# CIBC: 2025-01-20,Description,DebitAmount,CreditAmount, with no header. Anything unrecognised is read this way.
+CIBC = BankFormat('cibc', date=0, description=1, debit=2, credit=3)
+# A common export layout: a header row with Date, Description and one signed Amount column
+GENERIC_SIGNED = BankFormat('generic', date='Date', description='Description', amount='Amount', has_header=True)
+
+DEFAULT_FORMAT = CIBC
+FORMATS = {}
+
+def register_format(bank_format):
+    """Make a format available to detection. Later registrations are tried first."""
+    FORMATS[bank_format.name] = bank_format
+    return bank_format
+
+register_format(CIBC)
+register_format(GENERIC_SIGNED)
+
+def sniff_delimiter(sample):
+    """The field delimiter used in sample. Only the delimiter is sniffed: quoting is always standard double
+    quotes, as the Sniffer can mistake the apostrophes in names like TIM'S for quote characters."""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:  # Too little to go on, e.g. a one-column file
+        return ','
+
+def detect_format(sample, bank_format=None):
+    """(format, delimiter) for the text at the start of a file; bank_format skips the detection but not the sniffing.
+
+    The format comes back bound to the file's header row, if it has one.
+    """
+    lines = sample.splitlines(True)
+    if len(lines) > 1 and not sample.endswith(('\n', '\r')):
+        lines.pop()  # Cut off mid-line
+    sample = ''.join(lines[:SNIFF_ROWS])
+    delimiter = sniff_delimiter(sample)
+    rows = list(csv.reader(lines[:SNIFF_ROWS], delimiter=delimiter))
+
+    if bank_format is None:
+        bank_format = next((candidate for candidate in reversed(FORMATS.values()) if candidate.matches(rows)),
+                           DEFAULT_FORMAT)
+    if bank_format.has_header:
+        header = next((row for row in rows if any(cell.strip() for cell in row)), [])
+        bank_format = bank_format.bind(header)
+    return bank_format, delimiter
+
+def sniff_file(path, encoding, bank_format=None):
+    """detect_format for the start of the file at path."""
+    with open(path, 'rb') as file:
+        sample = file.read(SNIFF_BYTES)
+    return detect_format(sample.decode(encoding, errors='replace'), bank_format)
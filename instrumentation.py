@@ -0,0 +1,189 @@
+"""Opt-in timing for ExpensesDB methods and ExpenseApp page builders.
+
+Turned on with environment variables so normal runs pay nothing:
+
+    EXPENSE_ANALYZER_PROFILE=1                 time every DB call and page render
+    EXPENSE_ANALYZER_PROFILE_JSON=stats.json   also dump the stats there when the app closes
+    EXPENSE_ANALYZER_CPROFILE=show_summary     cProfile the first render of one page into show_summary.prof
+
+Page timings are split into the time spent inside ExpensesDB calls and everything else (Python
+formatting plus Tk widget creation/layout), which is usually the question when a page feels slow.
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)  # Upper bounds, plus one overflow bucket
+MAX_STATEMENTS = 100  # SQL kept per outermost call; executemany traces every row of an import
+
+# ExpensesDB plumbing that isn't worth timing (or would only time itself)
+SKIPPED_DB_METHODS = frozenset(['close', 'get_connection', 'get_write_connection', 'data_generation',
+                                'cache_stats', 'clear_cache', 'add_connection_hook', 'init_db'])
+
+def enabled():
+    return (os.environ.get('EXPENSE_ANALYZER_PROFILE', '') not in ('', '0')
+            or bool(os.environ.get('EXPENSE_ANALYZER_CPROFILE')))
+
+class _Series:
+    """Rolling window of durations for one name, plus a fixed-bucket histogram of every call."""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.rows = deque(maxlen=window)
+        self.inner = deque(maxlen=window)  # Time spent in nested instrumented calls (DB time for pages)
+        self.calls = 0
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def add(self, seconds, rows, inner):
+        self.calls += 1
+        self.samples.append(seconds)
+        self.inner.append(inner)
+        if rows is not None:
+            self.rows.append(rows)
+
+        ms = seconds * 1000
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if ms <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+        return {
+            'calls': self.calls,
+            'p50_ms': pct(50),
+            'p95_ms': pct(95),
+            'max_ms': round(ordered[-1] * 1000, 3),
+            'inner_ms_avg': round(sum(self.inner) / len(self.inner) * 1000, 3),
+            'rows_avg': round(sum(self.rows) / len(self.rows), 1) if self.rows else None,
+            'histogram': dict(zip([f'<={b}ms' for b in HISTOGRAM_BUCKETS_MS] + ['>1000ms'], self.histogram)),
+        }
+
+class Instrumentation:
+    def __init__(self, slow_ms=50.0, window=500):
+        self.slow_ms = slow_ms
+        self.window = window
+        self.series = defaultdict(lambda: _Series(self.window))
+        self.slow_calls = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._db = None
+        self._cprofile_target = os.environ.get('EXPENSE_ANALYZER_CPROFILE')
+
+    # ── Wiring ─────────────────────────────────────────────────────────────────
+
+    def attach_db(self, db):
+        """Time every public ExpensesDB method and capture the SQL each one runs."""
+        self._db = db
+        db.add_connection_hook(lambda conn: conn.set_trace_callback(self._trace))
+        names = [name for name in dir(type(db))
+                 if not name.startswith('_') and name not in SKIPPED_DB_METHODS and callable(getattr(db, name))]
+        self.wrap(db, names, prefix='db.')
+
+    def attach_app(self, app):
+        """Time every ExpenseApp.show_* page builder, including Tk's layout pass for the new widgets."""
+        names = [name for name in dir(type(app)) if name.startswith('show_')]
+        self.wrap(app, names, prefix='page.', settle=app.root.update_idletasks)
+
+    def wrap(self, obj, names, prefix='', settle=None):
+        for name in names:
+            setattr(obj, name, self._timed(prefix + name, getattr(obj, name), settle))
+
+    # ── Recording ──────────────────────────────────────────────────────────────
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._local.statements = []
+            self._local.explaining = False
+        return stack
+
+    def _trace(self, sql):
+        if (getattr(self._local, 'stack', None) and not self._local.explaining
+                and len(self._local.statements) < MAX_STATEMENTS):
+            self._local.statements.append(sql)
+
+    def _timed(self, name, func, settle=None):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self._stack()
+            frame = {'inner': 0.0, 'first_statement': len(self._local.statements)}
+            stack.append(frame)
+
+            profiler = None
+            if self._cprofile_target and name.endswith('.' + self._cprofile_target):
+                self._cprofile_target = None  # Only the first render
+                profiler = cProfile.Profile()
+                profiler.enable()
+
+            result = None
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                if settle is not None:
+                    settle()
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                if profiler is not None:
+                    profiler.disable()
+                    profiler.dump_stats(f'{name.split(".", 1)[1]}.prof')
+
+                stack.pop()
+                if stack:
+                    stack[-1]['inner'] += seconds
+                statements = self._local.statements[frame['first_statement']:]
+                if not stack:
+                    self._local.statements = []
+
+                rows = len(result) if isinstance(result, list) else None
+                self.record(name, seconds, rows, frame['inner'], statements)
+        return wrapper
+
+    def record(self, name, seconds, rows=None, inner=0.0, statements=()):
+        with self._lock:
+            self.series[name].add(seconds, rows, inner)
+
+        if seconds * 1000 >= self.slow_ms:
+            self.slow_calls.append({
+                'name': name,
+                'ms': round(seconds * 1000, 3),
+                'statements': [{'sql': sql.strip(), 'plan': self._explain(sql)} for sql in statements],
+            })
+
+    def _explain(self, sql):
+        if self._db is None or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+
+        self._local.explaining = True
+        try:
+            with self._db.get_connection() as conn:
+                return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        except Exception as e:  # A plan is nice to have, never worth breaking the app over
+            return [f'unavailable: {e}']
+        finally:
+            self._local.explaining = False
+
+    # ── Reporting ──────────────────────────────────────────────────────────────
+
+    def summary(self):
+        with self._lock:
+            return {name: series.summary() for name, series in sorted(self.series.items())}
+
+    def to_dict(self):
+        return {'slow_ms': self.slow_ms, 'series': self.summary(), 'slow_calls': list(self.slow_calls)}
+
+    def dump(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
@@ -0,0 +1,166 @@
+"""Vendor and debit/credit classification rules, loaded once from a JSON rules file.
+
+vendor_rules.json next to this file (or inside the PyInstaller bundle) is the default ruleset and
+reproduces the original hard-coded behaviour. Point EXPENSE_ANALYZER_RULES at another file to use
+bank-specific rules instead. Keys:
+
+    strip_prefixes       text up to and including the first of these is dropped before anything else
+    vendor_overrides     literal -> vendor name, checked in order after the strip
+    debit_terms          a description containing any of these is a debit (see debit_finder)
+    stop_keywords        tokens that end the backwards vendor-name scan
+    skip_token_patterns  regexes for reference numbers; the first one seen is skipped, the second ends the scan
+    trailing_pattern     regex removed from the end of the vendor name
+    fallback_patterns    [{"pattern": regex, "vendor": template}] tried when the scan finds no name
+    unknown_vendor       what to call it when nothing matched
+
+All the literals (strip prefixes, overrides and debit terms) are compiled into one Aho-Corasick
+automaton, so finding them is a single pass over the description however many rules there are.
+"""
+import json
+import os
+import re
+import sys
+from collections import deque
+
+RULES_ENV = 'EXPENSE_ANALYZER_RULES'
+DEFAULT_RULES_FILE = 'vendor_rules.json'
+
+RULE_KEYS = frozenset(['unknown_vendor', 'strip_prefixes', 'vendor_overrides', 'debit_terms', 'stop_keywords',
+                       'skip_token_patterns', 'trailing_pattern', 'fallback_patterns'])
+
+# What each literal in the automaton is for
+STRIP, OVERRIDE, DEBIT = 'strip', 'override', 'debit'
+
+def resource_path(name):
+    """Path to a data file shipped with the app, inside the PyInstaller bundle when running frozen."""
+    base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, name)
+
+class AhoCorasick:
+    """Finds every occurrence of a set of literal strings in one left-to-right pass over a text."""
+
+    def __init__(self, patterns):
+        """patterns: (literal, value) pairs; value is handed back with each occurrence found."""
+        goto = [{}]
+        outputs = [[]]
+        for literal, value in patterns:
+            if not literal:
+                raise ValueError("Empty literal in the rules")
+            state = 0
+            for char in literal:
+                following = goto[state].get(char)
+                if following is None:
+                    following = goto[state][char] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = following
+            outputs[state].append((len(literal), value))
+
+        # Breadth-first over the trie to fill in failure links, folding them straight into a full
+        # transition table so scanning never has to follow a failure chain
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for char, following in goto[state].items():
+                fail[following] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(following)
+
+        self._delta = delta
+        self._outputs = outputs
+
+    def find_all(self, text):
+        """[(start, end, value)] for every occurrence, overlapping ones included, ordered by end."""
+        delta = self._delta
+        outputs = self._outputs
+        found = []
+        state = 0
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                end = index + 1
+                found.extend((end - length, end, value) for length, value in outputs[state])
+        return found
+
+class VendorRules:
+    def __init__(self, rules):
+        unknown = set(rules) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown rule(s): {', '.join(sorted(unknown))}")
+
+        self.unknown_vendor = rules.get('unknown_vendor', 'UNKNOWN')
+        self.overrides = list(rules.get('vendor_overrides', {}).items())
+        self.stop_keywords = frozenset(keyword.upper() for keyword in rules.get('stop_keywords', ()))
+        self.skip_token_patterns = [re.compile(pattern) for pattern in rules.get('skip_token_patterns', ())]
+        self.trailing_pattern = re.compile(rules.get('trailing_pattern') or r'$^')
+        self.fallback_patterns = [(re.compile(rule['pattern']), rule['vendor'])
+                                  for rule in rules.get('fallback_patterns', ())]
+
+        # Rank = position in its list, the lower one wins when several match
+        self._automaton = AhoCorasick(
+            [(literal, (STRIP, rank)) for rank, literal in enumerate(rules.get('strip_prefixes', ()))]
+            + [(literal, (OVERRIDE, rank)) for rank, (literal, _vendor) in enumerate(self.overrides)]
+            + [(literal, (DEBIT, rank)) for rank, literal in enumerate(rules.get('debit_terms', ()))]
+        )
+
+    @classmethod
+    def load(cls, path=None):
+        """Rules from path, else from $EXPENSE_ANALYZER_RULES, else the bundled vendor_rules.json."""
+        path = path or os.environ.get(RULES_ENV) or resource_path(DEFAULT_RULES_FILE)
+        with open(path, encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    def has_debit_term(self, description):
+        return any(kind == DEBIT for _start, _end, (kind, _rank) in self._automaton.find_all(description))
+
+    def vendor(self, description):
+        """The vendor name in a bank description."""
+        strip = None  # (start, end) of the first strip prefix
+        override = None  # (rank, start) of the winning override
+        matches = self._automaton.find_all(description)
+
+        for start, end, (kind, rank) in matches:
+            if kind == STRIP and (strip is None or start < strip[0]):
+                strip = (start, end)
+        cut = strip[1] if strip is not None else 0
+
+        for start, _end, (kind, rank) in matches:
+            if kind == OVERRIDE and start >= cut and (override is None or rank < override[0]):
+                override = (rank, start)
+        if override is not None:
+            return self.overrides[override[0]][1]
+
+        vendor = self._scan_tokens(description[cut:])
+        if vendor:
+            return vendor
+
+        for pattern, template in self.fallback_patterns:
+            match = pattern.search(description)
+            if match:
+                return match.expand(template)
+        return self.unknown_vendor
+
+    def _scan_tokens(self, text):
+        vendor_parts = []
+        skipped = False  # A long banking number can appear before and/or after the vendor name, so I track
+                         # if it is gone yet
+
+        for part in reversed(text.split()):  # Start from the end of line (Vendor names were typically at the end)
+            if any(pattern.match(part) for pattern in self.skip_token_patterns):
+                if not skipped:  # Skip the first long reference/number we encounter
+                    skipped = True
+                    continue
+                break  # Stop at the second one
+
+            if part.upper() in self.stop_keywords:  # Also stop at common banking keywords
+                break
+
+            if part[0].isupper():  # Keep words that start with uppercase (allows "Garrison Brewin")
+                vendor_parts.append(part)
+
+        vendor_parts.reverse()
+        return self.trailing_pattern.sub('', ' '.join(vendor_parts)).strip()  # Drop trailing symbols and numbers
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ExpensesDB  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def app_data(tmp_path, monkeypatch):
+    """Keep ExpensesDB's app data folder inside the test's temporary directory."""
+    monkeypatch.setenv('APPDATA', str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def db(tmp_path):
+    with ExpensesDB(str(tmp_path / 'expenses.db')) as database:
+        yield database
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """write_csv(name, lines) -> path of a CSV file holding lines (written as bytes, no newline translation)."""
+    def write(name, lines, mode='wb'):
+        path = tmp_path / name
+        with open(path, mode) as file:
+            file.write(''.join(lines).encode('utf-8'))
+        return str(path)
+    return write
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from analytics import AnalyticsEngine  # noqa: E402
+from async_api import AsyncExpensesDB  # noqa: E402
+from benchmarks.generate import generate_lines  # noqa: E402
+from FileScrape import process_csv  # noqa: E402
+
+@pytest.fixture
+def loaded(db, write_csv):
+    process_csv(write_csv('statement.csv', generate_lines(20_000, seed=3)), db)
+    return db
+
+@pytest.mark.parametrize('report', ['total_purchase_vendor', 'average_spending_by_vendor'])
+def test_vendor_reports_match_sql_order(loaded, report):
+    sql_rows = getattr(loaded, report)()
+    loaded.clear_cache()
+    numpy_rows = getattr(AnalyticsEngine(loaded), report)()
+
+    assert [row[0] for row in numpy_rows] == [row[0] for row in sql_rows]
+    for numpy_row, sql_row in zip(numpy_rows, sql_rows):
+        assert numpy_row == pytest.approx(sql_row)
+
+def test_vendor_ties_break_on_name(db):
+    rows = [('2024-01', 5.0, 'Small', 'Debit', vendor) for vendor in ('ZED', 'ALPHA', 'MID')] * 5
+    db.add_expenses_bulk([rows])
+    engine = AnalyticsEngine(db)
+
+    assert [row[0] for row in engine.total_purchase_vendor()] == ['ALPHA', 'MID', 'ZED']
+    assert [row[0] for row in engine.average_spending_by_vendor()] == ['ALPHA', 'MID', 'ZED']
+
+REPORTS = ['expense_count', 'total_purchase_vendor', 'average_spending_by_vendor', 'total_year_over_year',
+           'largest_10_purchases', 'dashboard_stats']
+
+def test_concurrent_reports_load_the_rows_once(loaded):
+    expected = {report: getattr(AnalyticsEngine(loaded), report)() for report in REPORTS}
+
+    async def run_all():
+        db = AsyncExpensesDB(AnalyticsEngine(loaded))
+        try:
+            return await asyncio.gather(*(getattr(db, report)() for report in REPORTS * 3))
+        finally:
+            await db.close()
+
+    for _ in range(5):
+        assert asyncio.run(run_all()) == [expected[report] for report in REPORTS * 3]
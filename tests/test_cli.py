@@ -0,0 +1,19 @@
+import pytest
+
+import cli
+
+def test_missing_report_argument_is_a_usage_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as raised:
+        cli.main(['report', 'monthly_debit_credit_given_year', '--db', str(tmp_path / 'cli.db')])
+    assert raised.value.code == 2
+    assert "missing a required argument: 'year'" in capsys.readouterr().err
+
+def test_extra_report_argument_is_a_usage_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as raised:
+        cli.main(['report', 'expense_count', '2024', '--db', str(tmp_path / 'cli.db')])
+    assert raised.value.code == 2
+    assert "expense_count takes no arguments" in capsys.readouterr().err
+
+def test_report_with_its_arguments(tmp_path, capsys):
+    assert cli.main(['report', 'monthly_debit_credit_given_year', '2024', '--db', str(tmp_path / 'cli.db')]) == 0
+    assert capsys.readouterr().out.startswith('month,transaction_type,total')
@@ -0,0 +1,19 @@
+from benchmarks.generate import generate_lines
+from FileScrape import process_csv
+
+def test_vendor_highlights_agree_with_the_vendor_reports(db, write_csv):
+    process_csv(write_csv('statement.csv', generate_lines(5_000, seed=1)), db)
+    stats = db.dashboard_stats()
+
+    top = db.total_purchase_vendor()[0]
+    assert stats.most_visited == (top[0], top[2])
+    best = db.average_spending_by_vendor()[0]
+    assert stats.highest_avg_vendor == (best[0], best[1])
+
+def test_ties_go_to_the_first_name(db):
+    rows = [('2024-01', 5.0, 'Small', 'Debit', vendor) for vendor in ('ZED', 'ALPHA', 'MID')] * 5
+    db.add_expenses_bulk([rows])
+    stats = db.dashboard_stats()
+
+    assert stats.most_visited == ('ALPHA', 5)
+    assert stats.highest_avg_vendor == ('ALPHA', 5.0)
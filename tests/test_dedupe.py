@@ -0,0 +1,50 @@
+import hashlib
+
+from FileScrape import line_fingerprint, parse_lines, parse_range, process_csv, process_large_csv
+
+FEE = "2024-03-01,Branch Transaction SERVICE CHARGE MONTHLY FEE,4.95,,\n"
+COFFEE = "2024-03-02,Point of Sale - Interac RETAIL PURCHASE CORNER CAFE,5.00,,\n"
+LUNCH = "2024-03-03,Point of Sale - Interac RETAIL PURCHASE SUBWAY,12.50,,\n"
+
+def test_overlapping_statements_add_only_new_lines(db, write_csv):
+    assert process_csv(write_csv('jan.csv', [FEE, COFFEE]), db) == 2
+    assert process_csv(write_csv('feb.csv', [COFFEE, LUNCH]), db) == 1
+    assert db.expense_count() == 3
+
+    skipped = {path.rsplit('/', 1)[-1]: skipped for path, _added, _at, skipped, _account in db.get_imported_files()}
+    assert skipped == {'jan.csv': 0, 'feb.csv': 1}
+
+def test_identical_lines_on_two_accounts_are_both_kept(db, write_csv):
+    assert process_csv(write_csv('chequing.csv', [FEE, COFFEE]), db, account='chequing') == 2
+    assert process_csv(write_csv('savings.csv', [FEE]), db, account='savings') == 1
+    assert process_csv(write_csv('savings-again.csv', [FEE, LUNCH]), db, account='savings') == 1
+    assert process_large_csv(write_csv('savings-big.csv', [FEE, COFFEE]), db, workers=1,
+                             account='savings') == 1
+    assert db.expense_count() == 5
+    assert db.total_debits_credits() == [('Debit', 32.4)]
+
+def test_default_account_keeps_earlier_fingerprints():
+    line = FEE.strip().rstrip(',')
+    earlier = int.from_bytes(hashlib.blake2b(b"1:" + line.encode(), digest_size=8).digest(), 'big', signed=True)
+    assert line_fingerprint(line, 1) == earlier
+    assert [row[4] for row in parse_lines([FEE, FEE])] == [line_fingerprint(line, 0), earlier]
+
+def test_parse_range_scopes_fingerprints_like_parse_lines():
+    text = FEE + FEE + "2024-03-02,\"CAFÉ DU COIN, INC\",5.00,,\n"
+    buffer = text.encode('utf-8')
+    for account in ('', 'visa'):
+        assert (list(parse_range(buffer, 0, len(buffer), 'utf-8', account))
+                == list(parse_lines(text.splitlines(True), account=account)))
+    assert (list(parse_range(buffer, 0, len(buffer), 'utf-8', 'visa'))[0][4]
+            != list(parse_range(buffer, 0, len(buffer), 'utf-8'))[0][4])
+
+def test_blank_line_between_identical_same_day_lines_keeps_both(db, write_csv):
+    lines = [COFFEE, "\n", COFFEE, ",,\n", COFFEE]
+    assert [row[4] for row in parse_lines(lines)] == [line_fingerprint(COFFEE.strip().rstrip(','), n) for n in range(3)]
+    buffer = ''.join(lines).encode('utf-8')
+    assert list(parse_range(buffer, 0, len(buffer), 'utf-8')) == list(parse_lines(lines))
+
+    path = write_csv('statement.csv', lines)
+    assert process_csv(path) == 3
+    assert process_csv(path, db) == 3
+    assert process_large_csv(path, db, workers=1) == 0
@@ -0,0 +1,17 @@
+from formats import CIBC, detect_format
+from FileScrape import parse_lines
+
+def test_detects_cibc_with_any_delimiter():
+    assert detect_format("2024-03-01,TIM'S COFFEE,5.00,,\n2024-03-02,SHOP,3.00,,\n") == (CIBC, ',')
+    assert detect_format("2024-03-01;TIM'S COFFEE;5.00;;\n2024-03-02;SHOP;3.00;;\n") == (CIBC, ';')
+
+def test_detects_a_header_format_and_binds_its_columns():
+    bank_format, delimiter = detect_format("Description,Amount,Date\nSHOP,-3.00,2024-03-02\n")
+    assert (bank_format.name, delimiter) == ('generic', ',')
+    assert (bank_format.description, bank_format.amount, bank_format.date) == (0, 1, 2)
+
+def test_signed_amounts_give_the_transaction_type():
+    lines = ["Date,Description,Amount\n", "2024-03-02,SHOP,-3.00\n", "2024-03-03,REFUND,4.50\n", "2024-03-04,NOTE,\n"]
+    bank_format, delimiter = detect_format(''.join(lines))
+    records = [record[:4] for record in parse_lines(lines, bank_format, delimiter, skip_header=True)]
+    assert records == [('2024-03', 'SHOP', 3.0, 'Debit'), ('2024-03', 'REFUND', 4.5, 'Credit')]
@@ -0,0 +1,50 @@
+import json
+import time
+
+import pytest
+
+from benchmarks.generate import generate_lines
+from database import ExpensesDB
+
+tk = pytest.importorskip('tkinter')
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:  # No display to open a window on
+        pytest.skip('Tk cannot open a window here')
+    root.withdraw()
+    yield root
+    try:
+        root.destroy()
+    except tk.TclError:  # Already destroyed by on_close
+        pass
+
+def test_app_starts_with_profiling_enabled(root, monkeypatch, tmp_path):
+    dump_path = tmp_path / 'profile.json'
+    monkeypatch.setenv('EXPENSE_ANALYZER_PROFILE', '1')
+    monkeypatch.setenv('EXPENSE_ANALYZER_PROFILE_JSON', str(dump_path))
+    from GUI import ExpenseApp
+
+    app = ExpenseApp(root)
+    app.show_main_menu()
+    app.show_diagnostics()
+    app.on_close()
+
+    series = json.loads(dump_path.read_text())['series']
+    assert {'page.show_import_page', 'page.show_main_menu'} <= set(series)
+
+def test_closing_during_an_import_cancels_it_without_blocking(root, write_csv):
+    from GUI import ExpenseApp
+
+    app = ExpenseApp(root)
+    app.file_path_entry.insert(0, write_csv('statement.csv', generate_lines(200_000, seed=2)))
+    app.process_file()
+    started = time.perf_counter()
+    app.on_close()
+    assert time.perf_counter() - started < 0.5  # Didn't wait for the import's transaction
+
+    root.wait_window(root)  # Runs the Tk loop until the worker has rolled back and the window is gone
+    with ExpensesDB() as db:
+        assert db.expense_count() == 0
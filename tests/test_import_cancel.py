@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+from FileScrape import ImportCancelled, process_files
+
+def statement(day, vendor, rows=3):
+    return [f"2024-01-{day:02d},Point of Sale - Interac RETAIL PURCHASE {vendor},{n + 1}.00,,\n" for n in range(rows)]
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cancel_keeps_committed_files_and_stops(db, write_csv, workers):
+    paths = [write_csv(f'{n}.csv', statement(n + 1, f'SHOP{n}')) for n in range(4)]
+    cancel = threading.Event()
+
+    def on_file_done(path, records_added, files_done, files_total):
+        cancel.set()  # Cancel as soon as the first file is in
+
+    with pytest.raises(ImportCancelled) as raised:
+        process_files(paths, db, workers=workers, progress=on_file_done, cancel=cancel)
+
+    committed = raised.value.results
+    assert len(committed) == 1 and sum(committed.values()) == 3
+    assert db.expense_count() == 3
+    assert [row[0] for row in db.get_imported_files()] == list(committed)
+
+def test_cancel_before_start_adds_nothing(db, write_csv):
+    paths = [write_csv(f'{n}.csv', statement(n + 1, f'SHOP{n}')) for n in range(2)]
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(ImportCancelled) as raised:
+        process_files(paths, db, workers=2, cancel=cancel)
+    assert raised.value.results == {}
+    assert db.expense_count() == 0
@@ -0,0 +1,42 @@
+import pytest
+
+from FileScrape import MAX_RECORD_LINES, parse_lines, parse_range, process_csv
+
+def purchase(day, description, cost):
+    return f"2024-03-{day:02d},{description},{cost},,\n"
+
+STRAY = [
+    purchase(1, 'Point of Sale - Interac RETAIL PURCHASE SUBWAY 12" SUB', '5.00'),
+    purchase(2, 'Point of Sale - Interac RETAIL PURCHASE CORNER CAFE', '3.00'),
+    purchase(3, 'Point of Sale - Interac RETAIL PURCHASE SUBWAY 6" SUB', '4.00'),
+]
+
+def parsed(lines):
+    text = ''.join(lines)
+    records = list(parse_lines(text.splitlines(True)))
+    assert list(parse_range(text.encode('utf-8'), 0, len(text.encode('utf-8')), 'utf-8')) == records
+    return [(description, cost) for _year_month, description, cost, _type, _fingerprint in records]
+
+def test_stray_quotes_are_part_of_the_description(db, write_csv):
+    assert parsed(STRAY) == [('Point of Sale - Interac RETAIL PURCHASE SUBWAY 12" SUB', 5.0),
+                             ('Point of Sale - Interac RETAIL PURCHASE CORNER CAFE', 3.0),
+                             ('Point of Sale - Interac RETAIL PURCHASE SUBWAY 6" SUB', 4.0)]
+    assert process_csv(write_csv('stray.csv', STRAY), db) == 3
+
+@pytest.mark.parametrize('lines, expected', [
+    # A quoted field spanning lines
+    ([purchase(1, '"CAFE\nDU COIN, INC"', '5.00'), purchase(2, 'SHOP', '3.00')],
+     [('CAFE\nDU COIN, INC', 5.0), ('SHOP', 3.0)]),
+    # A quoted field with a stray quote in another field of the same line
+    (['2024-03-01,"A, B",7.00,,REF 12"\n', purchase(2, 'SHOP', '3.00')],
+     [('A, B', 7.0), ('SHOP', 3.0)]),
+    # A quote at the start of a field that is never closed
+    ([purchase(1, '"BEST BUY', '5.00'), purchase(2, 'SHOP', '3.00')],
+     [('"BEST BUY', 5.0), ('SHOP', 3.0)]),
+    # Closed by a stray quote further down, past the lines a quoted field may span
+    ([purchase(1, '"BEST BUY', '5.00')] + [purchase(2, 'SHOP', '3.00')] * MAX_RECORD_LINES
+     + [purchase(3, 'SUBWAY 12"', '4.00')],
+     [('"BEST BUY', 5.0)] + [('SHOP', 3.0)] * MAX_RECORD_LINES + [('SUBWAY 12"', 4.0)]),
+])
+def test_quoted_fields(lines, expected):
+    assert parsed(lines) == expected
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from database import ExpensesDB
+from FileScrape import process_csv, process_large_csv, watch_folder
+
+COFFEE = "2024-03-02,Point of Sale - Interac RETAIL PURCHASE CORNER CAFE,5.00,,\n"
+LUNCH = "2024-03-02,Point of Sale - Interac RETAIL PURCHASE SUBWAY,12.50,,\n"
+
+def test_half_written_line_waits_until_it_is_finished(db, write_csv):
+    path = write_csv('statement.csv', [COFFEE, LUNCH[:-4]])  # "...,12" still being written
+    assert process_csv(path, db, follow=True) == 1
+    assert process_csv(path, db, follow=True) == 0  # Still nothing new
+
+    with open(path, 'ab') as file:
+        file.write(LUNCH[-4:].encode())
+    assert process_csv(path, db, follow=True) == 1
+    assert db.summary_totals() == (17.5, 0, 2)
+
+@pytest.mark.parametrize('importer', [process_csv, process_large_csv])
+def test_last_line_without_a_newline_is_imported(db, write_csv, importer):
+    path = write_csv('statement.csv', [COFFEE, LUNCH.rstrip('\n')])
+    assert importer(path) == 2
+    assert importer(path, db) == 2
+    assert importer(path, db) == 0
+    assert db.summary_totals() == (17.5, 0, 2)
+
+    with open(path, 'ab') as file:
+        file.write(('\n' + COFFEE).encode())
+    assert process_csv(path, db, follow=True) == 1  # The line without a newline isn't counted twice
+    assert db.summary_totals() == (22.5, 0, 3)
+
+def test_appended_lines_resume_after_the_last_import(db, write_csv):
+    path = write_csv('statement.csv', [COFFEE, COFFEE])
+    assert process_csv(path, db) == 2
+    with open(path, 'ab') as file:
+        file.write((COFFEE + LUNCH).encode())
+    assert process_csv(path, db) == 2
+    assert db.expense_count() == 4
+
+def test_watch_reports_a_bad_file_and_imports_the_rest(db, write_csv, tmp_path):
+    write_csv('a-bad.csv', ["2024-03-01,Point of Sale - Interac RETAIL PURCHASE SHOP,abc,,\n"])
+    write_csv('b-good.csv', [COFFEE, LUNCH])
+    imported, failed = [], []
+    stop = threading.Event()
+    stop.set()  # One scan
+
+    watch_folder(str(tmp_path), db, stop=stop, progress=lambda path, added: imported.append(added),
+                 errors=lambda path, e: failed.append(path))
+
+    assert [path.rsplit('/', 1)[-1] for path in failed] == ['a-bad.csv']
+    assert imported == [2]
+    assert db.expense_count() == 2
+
+CAFE, SUBWAY = 'Point of Sale - Interac RETAIL PURCHASE CORNER CAFE', 'Point of Sale - Interac RETAIL PURCHASE SUBWAY'
+
+@pytest.mark.parametrize('importer, header, line', [
+    (process_csv, '', '2024-03-{day};{description};{cost};;\n'),
+    (process_csv, 'Description,Date,Amount\n', '{description},2024-03-{day},-{cost}\n'),
+    (process_csv, '', '2024-03-{day},"{description}\nLINE TWO",{cost},,\n'),
+    (process_large_csv, '', '2024-03-{day},"{description}\nLINE TWO",{cost},,\n'),
+])
+def test_resume_finds_the_last_day_in_any_format(db, write_csv, tmp_path, importer, header, line):
+    def lines(*rows):
+        return [line.format(day=f'{day:02d}', description=description, cost=cost) for day, description, cost in rows]
+
+    path = write_csv('statement.csv', [header] + lines((1, SUBWAY, '9.00'), (2, CAFE, '5.00'), (2, SUBWAY, '9.00'),
+                                                        (2, CAFE, '5.00')))
+    assert importer(path, db) == 4
+    with open(path, 'ab') as file:
+        file.write(''.join(lines((2, CAFE, '5.00'))).encode())
+    assert importer(path, db) == 1
+
+    with ExpensesDB(str(tmp_path / 'fresh.db')) as fresh:
+        assert importer(path, fresh) == 5
+        assert db.summary_totals() == fresh.summary_totals() == (33.0, 0, 5)
+
+def test_small_ranges_never_split_a_day_or_a_quoted_field(db, write_csv, tmp_path):
+    lines = [f'2024-03-{day:02d},"{CAFE}\nLINE TWO",5.00,,\n' if n % 3 else f'2024-03-{day:02d},{CAFE},5.00,,\n'
+             for day in range(1, 29) for n in range(day % 4 + 1)]
+    path = write_csv('statement.csv', lines)
+    assert process_large_csv(path, db, workers=2, range_bytes=64) == len(lines)
+
+    with ExpensesDB(str(tmp_path / 'lines.db')) as by_line:
+        assert process_csv(path, by_line) == len(lines)
+        assert process_large_csv(path, db, workers=2, range_bytes=64) == 0
+        assert db.monthly_debit_credit_given_year(2024) == by_line.monthly_debit_credit_given_year(2024)
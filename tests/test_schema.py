@@ -0,0 +1,44 @@
+import sqlite3
+
+from database import INDEXES, ExpensesDB
+
+def test_upgrade_drops_year_column_and_unused_indexes_and_adds_accounts(tmp_path):
+    path = str(tmp_path / 'v4.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            year_month TEXT,
+            cost_cents INTEGER NOT NULL,
+            category_id INTEGER,
+            type_id INTEGER,
+            vendor_id INTEGER,
+            year INTEGER,
+            fingerprint INTEGER
+        );
+        CREATE INDEX idx_expenses_year ON expenses(year, year_month, type_id, cost_cents);
+        CREATE INDEX idx_expenses_type_month ON expenses(type_id, year_month, cost_cents);
+        CREATE INDEX idx_expenses_type_category ON expenses(type_id, category_id, cost_cents);
+        INSERT INTO expenses VALUES (7, '2024-03', 1250, NULL, NULL, NULL, 2024, 42);
+        DELETE FROM sqlite_sequence;
+        INSERT INTO sqlite_sequence VALUES ('expenses', 9);
+        PRAGMA user_version = 4;
+    ''')
+    conn.close()
+
+    db = ExpensesDB(path)
+    assert db.all_expenses() == [(7, '2024-03', 12.5, None, None, None)]
+    db.add_expenses_bulk([[('2024-04', 1.0, 'Food', 'Debit', 'Cafe', 43)]])
+    assert db.add_expenses_bulk([[('2024-03', 12.5, None, None, None, 42)]]) == 0  # Now in the default account
+    assert db.add_expenses_bulk([[('2024-03', 12.5, None, None, None, 42)]], account='visa') == 1
+    db.close()
+
+    conn = sqlite3.connect(path)
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(expenses)')]
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_expenses%'")}
+    ids = [row[0] for row in conn.execute('SELECT id FROM expenses ORDER BY id')]
+    conn.close()
+
+    assert 'year' not in columns and 'account_id' in columns
+    assert indexes == set(INDEXES) | {'idx_expenses_fingerprint'}
+    assert len(ids) == 3 and ids[:2] == [7, 10]  # Ids of deleted rows are still never reused
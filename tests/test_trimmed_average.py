@@ -0,0 +1,89 @@
+"""average_debit_credit_overall against the window-function query it replaced (user-012)."""
+import math
+import random
+import sqlite3
+
+import pytest
+
+from FileScrape import price_categorization
+
+# The original query, verbatim, run over a plain (transaction_type, cost) table holding the same rows
+OLD_CTE = '''
+                WITH SpendingStats AS (
+                    SELECT
+                        transaction_type,
+                        cost,
+                        AVG(cost) OVER(PARTITION BY transaction_type) AS spend_avg,
+                        SQRT(
+                            AVG(cost * cost) OVER(PARTITION BY transaction_type) -
+                            AVG(cost) OVER(PARTITION BY transaction_type) *
+                            AVG(cost) OVER(PARTITION BY transaction_type)
+                        ) AS spend_stddev
+                    FROM expenses
+                )
+                SELECT transaction_type, AVG(cost) AS cleaned_avg
+                FROM SpendingStats
+                WHERE cost BETWEEN (spend_avg - (2 * spend_stddev)) AND (spend_avg + (2 * spend_stddev)) 
+                GROUP BY transaction_type
+                HAVING COUNT(*) > 1
+            '''
+
+def old_averages(rows, query=OLD_CTE):
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute('CREATE TABLE expenses (transaction_type TEXT, cost REAL)')
+        conn.executemany('INSERT INTO expenses VALUES (?, ?)', [(kind, cost) for kind, cost in rows])
+        return dict(conn.execute(query).fetchall())
+    except sqlite3.OperationalError as e:  # SQLite built without the math functions
+        pytest.skip(str(e))
+    finally:
+        conn.close()
+
+def load(db, rows):
+    if rows:
+        db.add_expenses_bulk([[('2024-01', cost, price_categorization(cost), kind, 'SHOP') for kind, cost in rows]])
+
+def assert_agrees(db, rows, stddevs=2.0, query=OLD_CTE):
+    load(db, rows)
+    new = dict(db.average_debit_credit_overall(stddevs))
+    old = old_averages(rows, query)
+
+    assert new.keys() == old.keys()
+    for kind, average in old.items():
+        assert math.isclose(new[kind], average, rel_tol=1e-9), kind
+
+def lognormal(kind, count, seed):
+    rng = random.Random(seed)
+    return [(kind, round(rng.lognormvariate(3.5, 1.2), 2)) for _ in range(count)]
+
+def test_many_rows(db):
+    assert_agrees(db, lognormal('Debit', 5000, 1) + lognormal('Credit', 800, 2) + [('Debit', 25_000.0)])
+
+def test_no_rows(db):
+    assert db.average_debit_credit_overall() == []
+    assert_agrees(db, [])
+
+def test_only_one_transaction_type(db):
+    assert_agrees(db, lognormal('Debit', 50, 3))
+
+def test_type_with_a_single_row_is_left_out(db):
+    rows = lognormal('Credit', 20, 4) + [('Debit', 12.5)]
+    assert_agrees(db, rows)
+    assert 'Debit' not in dict(db.average_debit_credit_overall())
+
+def test_identical_costs(db):
+    assert_agrees(db, [('Debit', 9.99)] * 8)
+
+def test_identical_costs_with_float_noise(db):
+    # Three 0.10 credits: in dollars AVG(cost * cost) - AVG(cost)^2 comes out slightly negative, so the old
+    # query's SQRT gave NULL and dropped Credit altogether. Whole cents have no such noise, so it's kept.
+    rows = [('Debit', 9.99)] * 6 + [('Credit', 0.1)] * 3
+    load(db, rows)
+    assert 'Credit' not in old_averages(rows)
+    assert dict(db.average_debit_credit_overall()) == pytest.approx({'Debit': 9.99, 'Credit': 0.1})
+
+def test_nothing_kept(db):
+    # No cost sits exactly on the mean once the cut-off is zero standard deviations wide
+    rows = [('Debit', 1.0), ('Debit', 2.0), ('Debit', 4.0)]
+    assert_agrees(db, rows, stddevs=0, query=OLD_CTE.replace('2 * spend_stddev', '0 * spend_stddev'))
+    assert db.average_debit_credit_overall(0) == []